@@ -0,0 +1,135 @@
+import numpy as np
+
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
+
+
+class ActiveRegionEnvironment:
+    """
+    Environment which only recomputes the tiles of the grid where something can change: the tiles that changed
+    during the last generation and their neighbouring tiles (a cell only depends on its direct neighbours, so any
+    other tile is guaranteed to stay the same). On mostly still boards the cost of a step is proportional to
+    the activity rather than to the area of the grid.
+    Only the standard (bounded) and the toroidal neighbourhoods are supported.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, tile_size: int = 32,
+                 initial_state=None):
+        """
+        :param width: The number of rows of the grid
+        :param height: The number of columns of the grid
+        :param neighbour_finder: The strategy used to find the neighbours of a cell (handles the grid edges)
+        :param life_strategy: The rule used to compute the next state of the cells (needs `next_states`)
+        :param tile_size: The size of the square tiles for which the activity is tracked
+        :param initial_state: A 2D array-like of shape (width, height) with the initial cell states (random if not set)
+        """
+        self.width = width
+        self.height = height
+        self.strategy = life_strategy or ConwayStrategy()
+        self.finder = neighbour_finder or StandardNeighbourFinder()
+        self.tile_size = tile_size
+
+        if isinstance(self.finder, ToroidNeighbourFinder):
+            self.toroidal = True
+        elif isinstance(self.finder, StandardNeighbourFinder):
+            self.toroidal = False
+        else:
+            raise NotImplementedError(f"{type(self.finder).__name__} is not supported by the active region environment")
+
+        self.tile_rows = -(-width // tile_size)
+        self.tile_columns = -(-height // tile_size)
+
+        # The grid lives at padded[1:width + 1, 1:height + 1], surrounded by a one cell halo and by dead cells
+        # up to a whole number of tiles
+        self.padded = np.zeros((self.tile_rows * tile_size + 2, self.tile_columns * tile_size + 2), dtype=np.uint8)
+        if initial_state is None:
+            self.padded[1:width + 1, 1:height + 1] = np.random.randint(0, 2, size=(width, height), dtype=np.uint8)
+        self._refresh_halo()
+
+        self.active = np.ones((self.tile_rows, self.tile_columns), dtype=bool)
+
+        self.generation = 0
+        self.evaluated_cells = 0
+        self.last_evaluated_cells = 0
+        if initial_state is not None:
+            self.set_states(initial_state)
+
+    @property
+    def active_fraction(self):
+        """The fraction of the grid cells evaluated during the last step"""
+        return self.last_evaluated_cells / (self.width * self.height)
+
+    def get_states(self):
+        """Returns the cell states as a `uint8` array of shape (width, height)."""
+        return self.padded[1:self.width + 1, 1:self.height + 1]
+
+    def set_states(self, states):
+        """Replaces the cell states of the whole grid.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        self.padded[1:self.width + 1, 1:self.height + 1] = states
+        self._refresh_halo()
+        self.active[:] = True
+
+    def _refresh_halo(self):
+        """For a toroid, copies the opposite edges of the grid into the halo"""
+        if not self.toroidal:
+            return
+
+        width, height = self.width, self.height
+        self.padded[0, 1:height + 1] = self.padded[width, 1:height + 1]
+        self.padded[width + 1, 1:height + 1] = self.padded[1, 1:height + 1]
+        self.padded[:, 0] = self.padded[:, height]
+        self.padded[:, height + 1] = self.padded[:, 1]
+
+    def _dilate(self, tiles):
+        """Marks the 8 neighbouring tiles of every marked tile"""
+        if self.toroidal:
+            rows = tiles | np.roll(tiles, 1, axis=0) | np.roll(tiles, -1, axis=0)
+            return rows | np.roll(rows, 1, axis=1) | np.roll(rows, -1, axis=1)
+
+        padded = np.zeros((tiles.shape[0] + 2, tiles.shape[1] + 2), dtype=bool)
+        padded[1:-1, 1:-1] = tiles
+        rows = padded[:-2] | padded[1:-1] | padded[2:]
+        return rows[:, :-2] | rows[:, 1:-1] | rows[:, 2:]
+
+    def step(self):
+        """Updates the active tiles of the environment based on the current cell states."""
+        size = self.tile_size
+        tile_x, tile_y = np.nonzero(self.active)
+
+        # Gather every active tile together with its halo into a (tiles, size + 2, size + 2) stack
+        offsets = np.arange(size + 2)
+        rows = (tile_x * size)[:, None] + offsets
+        columns = (tile_y * size)[:, None] + offsets
+        windows = self.padded[rows[:, :, None], columns[:, None, :]]
+
+        alive = self.strategy.alive(windows)
+        counts = np.zeros((len(tile_x), size, size), dtype=np.uint8)
+        for dx in range(3):
+            for dy in range(3):
+                if dx == 1 and dy == 1:
+                    continue
+                counts += alive[:, dx:dx + size, dy:dy + size]
+
+        current = windows[:, 1:-1, 1:-1]
+        inner_rows = rows[:, 1:-1]
+        inner_columns = columns[:, 1:-1]
+
+        # cells of the padding beyond the grid always stay dead
+        valid = (inner_rows <= self.width)[:, :, None] & (inner_columns <= self.height)[:, None, :]
+        next_states = self.strategy.next_states(current, counts) * valid
+
+        changed = np.zeros_like(self.active)
+        changed[tile_x, tile_y] = ((next_states != current) & valid).any(axis=(1, 2))
+
+        self.padded[inner_rows[:, :, None], inner_columns[:, None, :]] = next_states
+        self._refresh_halo()
+
+        self.active = self._dilate(changed)
+
+        self.generation += 1
+        self.last_evaluated_cells = int(valid.sum())
+        self.evaluated_cells += self.last_evaluated_cells
@@ -0,0 +1,321 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from conway.conway.active_environment import ActiveRegionEnvironment
+from conway.conway.dir_util import make_file_dir_if_not_exist
+from conway.conway.environment import Environment, ArrayEnvironment
+from conway.conway.hashlife import HashLifeEnvironment
+from conway.conway.parallel_environment import ParallelEnvironment
+from conway.conway.packed_environment import BitPackedEnvironment
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
+from conway.conway.sparse_environment import SparseEnvironment
+from conway.conway.strategy import ConwayStrategy, HighLifeStrategy, RuleStrategy
+
+ENVIRONMENT_TYPES = (Environment, ArrayEnvironment, BitPackedEnvironment, ActiveRegionEnvironment,
+                     ParallelEnvironment)
+
+# Every stepping backend of the suite, by name
+BACKENDS = {environment_type.__name__: environment_type
+            for environment_type in ENVIRONMENT_TYPES + (SparseEnvironment, HashLifeEnvironment)}
+FINDERS = {"standard": StandardNeighbourFinder, "toroid": ToroidNeighbourFinder}
+
+SUITE_SIZES = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+SUITE_DENSITIES = (0.05, 0.5)
+
+# The largest number of cells the backends working cell by cell (or alive cell by alive cell on random soups) are
+# run on, past which a single generation takes minutes
+MAX_CELLS = {"Environment": 256 * 256, "HashLifeEnvironment": 512 * 512, "SparseEnvironment": 2048 * 2048}
+
+
+def generations_per_second(environment, generations: int) -> float:
+    """Steps the environment for the given number of generations and returns the achieved speed
+    :param environment: The environment to step (it is modified in place)
+    :param generations: The number of generations to run"""
+    start = time.perf_counter()
+    for _ in range(generations):
+        environment.step()
+    elapsed = time.perf_counter() - start
+
+    return generations / elapsed
+
+
+def close_environment(environment):
+    """Releases the workers and shared memory of the environments holding some (see `ParallelEnvironment`)"""
+    if hasattr(environment, "close"):
+        environment.close()
+
+
+def check_identical(width, height, generations, neighbour_finder, life_strategy, seed=0):
+    """Runs every environment implementation from the same random state and checks that they produce
+    the same states as the object environment after every generation"""
+    initial_state = np.random.default_rng(seed).integers(0, 2, size=(width, height), dtype=np.uint8)
+
+    environments = []
+    try:
+        for environment_type in ENVIRONMENT_TYPES:
+            environments.append(environment_type(width, height, neighbour_finder, life_strategy,
+                                                 initial_state=initial_state))
+
+        for generation in range(generations):
+            for environment in environments:
+                environment.step()
+
+            expected = environments[0].get_states()
+            for environment in environments[1:]:
+                if not np.array_equal(expected, environment.get_states()):
+                    raise AssertionError(f"{type(environment).__name__} diverged at generation {generation + 1}")
+    finally:
+        for environment in environments:
+            close_environment(environment)
+
+
+def compare(width, height, generations, neighbour_finder, life_strategy=ConwayStrategy()):
+    speeds = {}
+    for environment_type in ENVIRONMENT_TYPES:
+        environment = environment_type(width, height, neighbour_finder, life_strategy)
+        try:
+            speeds[environment_type.__name__] = generations_per_second(environment, generations)
+        finally:
+            close_environment(environment)
+
+    return speeds
+
+
+def compare_sparse(size, generations, gliders, seed=0):
+    """Compares the array environment with the active region environment on a toroidal board which is empty
+    except for a number of gliders, so the speed of the latter should follow the activity instead of the area"""
+    glider = np.array([[0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    initial_state = np.zeros((size, size), dtype=np.uint8)
+    for x, y in rng.integers(0, size - 3, size=(gliders, 2)):
+        initial_state[x:x + 3, y:y + 3] |= glider
+
+    speeds = {}
+    for environment_type in (ArrayEnvironment, ActiveRegionEnvironment):
+        environment = environment_type(size, size, ToroidNeighbourFinder())
+        environment.set_states(initial_state)
+        speeds[environment_type.__name__] = generations_per_second(environment, generations)
+
+    return speeds, environment.active_fraction
+
+
+def scaling(size, generations, worker_counts, use_processes=False, neighbour_finder=ToroidNeighbourFinder()):
+    """Measures the speed of the parallel environment for every number of workers"""
+    initial_state = np.random.default_rng(0).integers(0, 2, size=(size, size), dtype=np.uint8)
+
+    speeds = {}
+    for workers in worker_counts:
+        with ParallelEnvironment(size, size, neighbour_finder, workers=workers,
+                                 use_processes=use_processes) as environment:
+            environment.set_states(initial_state)
+            speeds[workers] = generations_per_second(environment, generations)
+
+    return speeds
+
+
+def peak_rss() -> int:
+    """Returns the peak resident set size of the current process in bytes, or `None` if it cannot be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(environment, generations: int, time_budget: float = None):
+    """Steps the environment and records the latency of every step
+    :param environment: The environment to step (it is modified in place)
+    :param generations: The maximum number of generations to run
+    :param time_budget: If set, stops after this many seconds (at least 3 generations are run though)
+    :return: The latencies of the steps in seconds"""
+    latencies = []
+    start = time.perf_counter()
+    for generation in range(generations):
+        step_start = time.perf_counter()
+        environment.step()
+        latencies.append(time.perf_counter() - step_start)
+
+        if time_budget is not None and generation >= 2 and time.perf_counter() - start > time_budget:
+            break
+
+    return np.array(latencies)
+
+
+def run_case(backend: str, finder: str, size: int, density: float, generations: int, time_budget: float = None,
+             seed: int = 0) -> dict:
+    """Runs one case of the suite: a random soup of the given density on a size x size grid
+    :param backend: The name of the environment (a key of `BACKENDS`)
+    :param finder: The name of the neighbourhood (a key of `FINDERS`)
+    :return: The result of the case, with `status` set to `skipped` (and a `reason`) if the backend cannot run it"""
+    result = {"backend": backend, "finder": finder, "size": size, "cells": size * size, "density": density}
+    if size * size > MAX_CELLS.get(backend, size * size):
+        return dict(result, status="skipped", reason=f"more than {MAX_CELLS[backend]} cells")
+
+    initial_state = (np.random.default_rng(seed).random((size, size)) < density).astype(np.uint8)
+    setup_start = time.perf_counter()
+    try:
+        environment = BACKENDS[backend](size, size, FINDERS[finder](), ConwayStrategy())
+    except NotImplementedError as error:
+        return dict(result, status="skipped", reason=str(error))
+    try:
+        environment.set_states(initial_state)
+        setup = time.perf_counter() - setup_start
+        latencies = measure(environment, generations, time_budget)
+    finally:
+        close_environment(environment)
+
+    percentiles = np.percentile(latencies, (50, 90, 99))
+    return dict(result, status="ok", generations=len(latencies), setup_seconds=setup,
+                cells_per_second=size * size * len(latencies) / latencies.sum(),
+                latency_seconds={"p50": percentiles[0], "p90": percentiles[1], "p99": percentiles[2],
+                                 "max": latencies.max(), "mean": latencies.mean()},
+                peak_rss_bytes=peak_rss())
+
+
+def _run_isolated_case(arguments):
+    return run_case(*arguments)
+
+
+def run_suite(sizes=SUITE_SIZES, densities=SUITE_DENSITIES, finders=tuple(FINDERS), backends=tuple(BACKENDS),
+              generations: int = 20, time_budget: float = 10.0, seed: int = 0, isolated: bool = True):
+    """Runs every combination of backend, neighbourhood, grid size and density
+    :param generations: The maximum number of generations of a case
+    :param time_budget: The time after which a case stops (at least 3 generations are run though)
+    :param seed: The seed of the random soups (the same soup is used for all the backends)
+    :param isolated: If set to `True`, every case runs in a fresh process, so the peak RSS is the one of the case
+    rather than of the whole suite
+    :return: The list of the case results (see `run_case`)"""
+    cases = [(backend, finder, size, density, generations, time_budget, seed)
+             for size in sizes for density in densities for finder in finders for backend in backends]
+
+    if not isolated:
+        return [run_case(*case) for case in cases]
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(_run_isolated_case, (case,)))
+    return results
+
+
+def suite_metadata() -> dict:
+    """Describes the machine and the versions the suite ran with, so the reports of different runs can be compared"""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def find_regressions(baseline, current, tolerance: float = 0.1):
+    """Compares two suite reports and returns the cases whose speed dropped by more than the tolerance
+    :param baseline: The report of the reference run (as written by `main`)
+    :param current: The report of the new run
+    :param tolerance: The accepted relative slowdown
+    :return: A list of (case, baseline cells/s, current cells/s)"""
+    def key(result):
+        return result["backend"], result["finder"], result["size"], result["density"]
+
+    reference = {key(result): result for result in baseline["results"] if result["status"] == "ok"}
+    regressions = []
+    for result in current["results"]:
+        previous = reference.get(key(result))
+        if result["status"] == "ok" and previous is not None:
+            if result["cells_per_second"] < previous["cells_per_second"] * (1 - tolerance):
+                regressions.append((key(result), previous["cells_per_second"], result["cells_per_second"]))
+    return regressions
+
+
+def report_speeds():
+    """Checks that the environments agree and prints a quick comparison of their speeds"""
+    for finder in (StandardNeighbourFinder(), ToroidNeighbourFinder()):
+        for strategy in (ConwayStrategy(), HighLifeStrategy(), RuleStrategy("Day&Night"), RuleStrategy("B2/S")):
+            check_identical(37, 23, 50, finder, strategy)
+            check_identical(9, 130, 50, finder, strategy)
+
+    for size in (50, 100, 200):
+        for finder in (StandardNeighbourFinder(), ToroidNeighbourFinder()):
+            speeds = compare(size, size, 5, finder)
+            print(f"{size}x{size} {type(finder).__name__}: " +
+                  ", ".join(f"{name} {speed:.1f} gen/s" for name, speed in speeds.items()))
+
+    for gliders in (1, 10, 100):
+        speeds, active_fraction = compare_sparse(1024, 20, gliders)
+        print(f"1024x1024 with {gliders} gliders ({active_fraction:.1%} active): " +
+              ", ".join(f"{name} {speed:.1f} gen/s" for name, speed in speeds.items()))
+
+    for use_processes in (False, True):
+        speeds = scaling(2048, 10, (1, 2, 4, 8), use_processes)
+        print(f"2048x2048 ParallelEnvironment ({'processes' if use_processes else 'threads'}): " +
+              ", ".join(f"{workers} workers {speed:.1f} gen/s" for workers, speed in speeds.items()))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the Game of Life backends and writes a JSON report")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES, help="The sides of the square grids")
+    parser.add_argument("--densities", type=float, nargs="+", default=SUITE_DENSITIES,
+                        help="The initial probabilities of a cell to be alive")
+    parser.add_argument("--finders", nargs="+", choices=FINDERS, default=list(FINDERS), help="The neighbourhoods")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS), help="The environments")
+    parser.add_argument("--generations", type=int, default=20, help="The maximum number of generations per case")
+    parser.add_argument("--time-budget", type=float, default=10.0, help="The maximum duration of a case in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random soups")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run the cases in this process (faster, but the peak RSS accumulates)")
+    parser.add_argument("--output", default="out/benchmark.json", help="The file where the report is saved")
+    parser.add_argument("--baseline", help="A previous report to compare the speeds with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="The accepted relative slowdown")
+    parser.add_argument("--report", action="store_true",
+                        help="Only check the environments agree and print a quick comparison of their speeds")
+    args = parser.parse_args(arguments)
+
+    if args.report:
+        report_speeds()
+        return
+
+    results = run_suite(args.sizes, args.densities, args.finders, args.backends, args.generations,
+                        args.time_budget, args.seed, not args.in_process)
+    report = {"metadata": dict(suite_metadata(), generations=args.generations, time_budget=args.time_budget,
+                               seed=args.seed), "results": results}
+
+    make_file_dir_if_not_exist(args.output)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, default=float)
+
+    for result in results:
+        case = f"{result['backend']} {result['finder']} {result['size']}x{result['size']} p={result['density']}"
+        if result["status"] == "ok":
+            latency = result["latency_seconds"]
+            print(f"{case}: {result['cells_per_second']:.3g} cells/s, p50 {latency['p50'] * 1000:.2f} ms, "
+                  f"p99 {latency['p99'] * 1000:.2f} ms, peak RSS {(result['peak_rss_bytes'] or 0) / 2 ** 20:.0f} MiB")
+        else:
+            print(f"{case}: skipped ({result['reason']})")
+    print(f"Saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = find_regressions(json.load(file), report, args.tolerance)
+        for case, previous, current in regressions:
+            print(f"Regression {case}: {previous:.3g} -> {current:.3g} cells/s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,47 @@ import conway.conway.strategy as s
 
 
 class Cell:
-    def __init__(self, x, y, state = 0, strategy = None):
+    """
+    A cell of the grid. Its state is not stored in the object itself but in a shared byte buffer (at `index`),
+    so cells can be created on demand as light views over the environment states. A cell created on its own
+    gets a buffer of its own. A cell without a strategy follows the one of its grid (or Conway's rule on its own).
+    """
+    __slots__ = ('x', 'y', '_strategy', 'buffer', 'index', 'row')
+
+    def __init__(self, x, y, state = 0, strategy = None, buffer = None, index = 0):
         self.x = x
         self.y = y
-        self.state = state
-        self.strategy = strategy or s.ConwayStrategy()
+        self._strategy = strategy
+        self.row = None
+
+        if buffer is None:
+            buffer = bytearray([state])
+        else:
+            buffer[index] = state
+        self.buffer = buffer
+        self.index = index
+
+    @property
+    def strategy(self):
+        """The strategy of the cell, the one of its grid unless it was given its own"""
+        if self.row is not None:
+            return self.row.strategy_at(self.y)
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, value):
+        if self.row is not None:
+            self.row.set_strategy(self.y, value)
+        else:
+            self._strategy = value
+
+    @property
+    def state(self):
+        return self.buffer[self.index]
+
+    @state.setter
+    def state(self, value):
+        self.buffer[self.index] = value
 
     def perceive(self, env):
         """Gathers information from the environment for the cell (the cell neighbours)
@@ -19,8 +55,95 @@ class Cell:
         """Computes the next state of the cell based on the cell life strategy
         :param env: Environment object (The grid)
         """
-        return self.strategy.next_state(self, env)
+        strategy = self.strategy
+        if strategy is None:
+            strategy = getattr(env, "strategy", None) or s.ConwayStrategy()
+        return strategy.next_state(self, env)
 
     def __str__(self):
         return str(self.state)
 
+
+class CellRow:
+    """A row of a `CellGrid`, creating the `Cell` views of its positions when they are accessed"""
+    __slots__ = ('x', 'height', 'offset', 'buffer', 'strategy', 'overrides')
+
+    def __init__(self, x, height, buffer, strategy, overrides=None):
+        self.x = x
+        self.height = height
+        self.offset = x * height
+        self.buffer = buffer
+        self.strategy = strategy
+        self.overrides = overrides if overrides is not None else {}
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError("cell index out of range")
+
+        cell = Cell.__new__(Cell)
+        cell.x = self.x
+        cell.y = y
+        cell._strategy = None
+        cell.buffer = self.buffer
+        cell.index = self.offset + y
+        cell.row = self
+        return cell
+
+    def __setitem__(self, y, cell):
+        """
+        Copies the state of a cell to this position, along with its strategy if it has one which is not the one of
+        the grid
+        """
+        if not 0 <= y < self.height:
+            raise IndexError("cell index out of range")
+        self.buffer[self.offset + y] = cell.state
+        self.set_strategy(y, cell.strategy)
+
+    def strategy_at(self, y):
+        """Returns the strategy of the cell at the given position of the row"""
+        return self.overrides.get((self.x, y), self.strategy) if self.overrides else self.strategy
+
+    def set_strategy(self, y, strategy):
+        """
+        Sets the strategy of the cell at the given position of the row
+        :param y: The position of the cell in the row
+        :param strategy: Its strategy, None (or the one of the grid) for the cell to follow the strategy of the grid
+        """
+        if strategy is None or strategy is self.strategy:
+            self.overrides.pop((self.x, y), None)
+        else:
+            self.overrides[self.x, y] = strategy
+
+    def __iter__(self):
+        for y in range(self.height):
+            yield self[y]
+
+
+class CellGrid:
+    """
+    Grid of cells indexed as grid[x][y], backed by a single byte buffer of width * height states (row after row).
+    The `Cell` objects are created on demand as views over the buffer, so only the states (and one small object
+    per row) are kept in memory. Cells with a strategy of their own (assigned with `grid[x][y] = cell` or
+    `grid[x][y].strategy = strategy`) are kept in the sparse `overrides` dictionary, by position.
+    """
+    __slots__ = ('width', 'height', 'buffer', 'strategy', 'rows', 'overrides')
+
+    def __init__(self, width, height, buffer, strategy):
+        self.width = width
+        self.height = height
+        self.buffer = buffer
+        self.strategy = strategy
+        self.overrides = {}
+        self.rows = [CellRow(x, height, buffer, strategy, self.overrides) for x in range(width)]
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, x):
+        return self.rows[x]
+
+    def __iter__(self):
+        return iter(self.rows)
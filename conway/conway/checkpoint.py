@@ -0,0 +1,136 @@
+import hashlib
+import os
+import struct
+
+import numpy as np
+
+from conway.conway.dir_util import make_file_dir_if_not_exist
+
+MAGIC = b"CONWAYCK"
+VERSION = 2
+# magic, version, current slot, toroidal flag, width, height, generation, tile size, rule
+HEADER = struct.Struct("<8sHBBQQQI64s")
+# the two slots of states start at a fixed offset, after the header
+DATA_OFFSET = 256
+
+
+class Checkpoint:
+    """
+    Checkpoint file of a simulation: a small header (grid size, generation, rule and geometry) followed by two slots
+    of grid states, one byte per cell, which are accessed through a memory map. Writing a checkpoint only rewrites
+    the tiles which changed since that slot was last written, and opening it does not read the states until they are
+    used.
+
+    The header points to the slot of the last complete checkpoint. A new one is written to the other slot, which is
+    flushed before the header is switched to it, so a checkpoint interrupted by a crash leaves the previous one intact.
+    Use `Checkpoint.create` to start a new file and `Checkpoint.open` to open an existing one.
+    """
+    def __init__(self, filename, width, height, generation, rule, toroidal, tile_size, slot=0):
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.generation = generation
+        self.rule = rule
+        self.toroidal = toroidal
+        self.tile_size = tile_size
+        self.slot = slot
+        self.mapped = np.memmap(filename, dtype=np.uint8, mode="r+", offset=DATA_OFFSET, shape=(2, width, height))
+        # digests of the tiles of every slot as last written, unknown for an opened file
+        self.digests = [None, None]
+
+    @classmethod
+    def create(cls, filename, width: int, height: int, rule: str, toroidal: bool, tile_size: int = 256):
+        """Creates an empty checkpoint file (its states are all 0, at generation 0)
+        :param filename: The checkpoint file (can include directories)
+        :param width: The number of rows of the grid
+        :param height: The number of columns of the grid
+        :param rule: The rule of the simulation, as a B/S rule string
+        :param toroidal: Whether the edges of the grid wrap around
+        :param tile_size: The size of the square tiles compared between two checkpoints"""
+        make_file_dir_if_not_exist(filename)
+        with open(filename, "wb") as file:
+            file.write(cls._pack_header(width, height, 0, rule, toroidal, tile_size, slot=0))
+            file.truncate(DATA_OFFSET + 2 * width * height)
+
+        checkpoint = cls(filename, width, height, 0, rule, toroidal, tile_size)
+        checkpoint.digests = [{}, {}]
+        return checkpoint
+
+    @classmethod
+    def open(cls, filename):
+        """Opens an existing checkpoint file, only reading its header"""
+        with open(filename, "rb") as file:
+            header = file.read(HEADER.size)
+
+        magic, version, slot, toroidal, width, height, generation, tile_size, rule = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a checkpoint file")
+        if version != VERSION:
+            raise ValueError(f"{filename} is a version {version} checkpoint, only version {VERSION} is supported")
+
+        return cls(filename, width, height, generation, rule.rstrip(b"\0").decode("ascii"), bool(toroidal), tile_size,
+                   slot)
+
+    @staticmethod
+    def _pack_header(width, height, generation, rule, toroidal, tile_size, slot):
+        return HEADER.pack(MAGIC, VERSION, slot, int(toroidal), width, height, generation, tile_size,
+                           rule.encode("ascii")).ljust(DATA_OFFSET, b"\0")
+
+    def _write_header(self):
+        with open(self.filename, "r+b") as file:
+            file.write(self._pack_header(self.width, self.height, self.generation, self.rule, self.toroidal,
+                                         self.tile_size, self.slot))
+            file.flush()
+            os.fsync(file.fileno())
+
+    @property
+    def states(self):
+        """The states of the last complete checkpoint, as a copy-on-write memory map of shape (width, height)"""
+        return np.memmap(self.filename, dtype=np.uint8, mode="c", offset=DATA_OFFSET + self.slot * self.width *
+                         self.height, shape=(self.width, self.height))
+
+    def write(self, states, generation: int):
+        """Saves the states of a generation to the slot not holding the last checkpoint, only rewriting the tiles
+        which changed since that slot was written, then switches the header to it
+        :param states: The (width, height) states
+        :param generation: The generation of the states
+        :return: The number of tiles rewritten"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        slot = 1 - self.slot
+        mapped = self.mapped[slot]
+        previous = self.digests[slot]
+        # until the slot is completely written, its content is unknown
+        self.digests[slot] = None
+        size = self.tile_size
+        changed = 0
+        digests = {}
+        for x in range(0, self.width, size):
+            for y in range(0, self.height, size):
+                tile = np.ascontiguousarray(states[x:x + size, y:y + size])
+                digest = hashlib.blake2b(tile, digest_size=16).digest()
+                digests[x, y] = digest
+
+                if previous is None:
+                    # nothing is known about the content of an opened file, so compare with it directly
+                    if np.array_equal(mapped[x:x + size, y:y + size], tile):
+                        continue
+                elif previous.get((x, y)) == digest:
+                    continue
+                mapped[x:x + size, y:y + size] = tile
+                changed += 1
+
+        # the new slot only becomes the checkpoint once it is completely on disk
+        self.mapped.flush()
+        self.slot = slot
+        self.generation = generation
+        self._write_header()
+        self.digests[slot] = digests
+
+        return changed
+
+    def close(self):
+        self.mapped.flush()
+        del self.mapped
@@ -0,0 +1,40 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+def state_hash(states) -> bytes:
+    """Returns a 128 bit digest of a states array (hashed straight from its memory, without copying it)"""
+    return hashlib.blake2b(np.ascontiguousarray(states), digest_size=16).digest()
+
+
+class CycleDetector:
+    """
+    Remembers the hashes of the last generations to detect when the grid repeats a previous state: a still life
+    (period 1) or an oscillator (period > 1), after a transient of a number of generations.
+    Only the last `max_history` generations are kept, so longer periods are not detected.
+    """
+    def __init__(self, max_history: int = 1024):
+        self.max_history = max_history
+        self.history = OrderedDict()
+        self.period = None
+        self.transient = None
+
+    def observe(self, generation: int, states) -> bool:
+        """Records the states of a generation
+        :param generation: The generation number (increasing by one between calls)
+        :param states: The states array of the generation
+        :return: `True` if the states were already seen, in which case `period` and `transient` are set"""
+        key = state_hash(states)
+
+        first_seen = self.history.get(key)
+        if first_seen is not None:
+            self.period = generation - first_seen
+            self.transient = first_seen
+            return True
+
+        self.history[key] = generation
+        if len(self.history) > self.max_history:
+            self.history.popitem(last=False)
+        return False
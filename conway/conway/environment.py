@@ -1,14 +1,29 @@
-import random
-from conway.conway.cell import Cell
+import numpy as np
+
+from conway.conway.cell import CellGrid
 from conway.conway.neighbour import StandardNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
 
 
 class Environment:
-    def __init__(self, width, height, neighbour_finder=None):
+    """
+    Environment in which every cell decides its next state through its life strategy, so any `LifeStrategy`
+    works with it. The states are kept in a single byte buffer (also exposed as the `states` array), and the
+    `Cell` objects of `grid` are created on demand as views over it.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, initial_state=None):
         self.width = width
         self.height = height
-        self.grid = [[Cell(x, y, random.randint(0, 1)) for x in range(height)] for y in range(width)]
+        self.strategy = life_strategy or ConwayStrategy()
+        if initial_state is None:
+            self.buffer = bytearray(np.random.randint(0, 2, size=width * height, dtype=np.uint8).tobytes())
+        else:
+            self.buffer = bytearray(width * height)
+        self.states = np.frombuffer(self.buffer, dtype=np.uint8).reshape(width, height)
+        self.grid = CellGrid(width, height, self.buffer, self.strategy)
         self.finder = neighbour_finder or StandardNeighbourFinder()
+        if initial_state is not None:
+            self.set_states(initial_state)
 
 
     def get_neighbors(self, x, y):
@@ -17,12 +32,64 @@ class Environment:
         :param y: y coordinate"""
         return self.finder.find_neighbours(x, y, self)
 
+    def get_states(self):
+        """Returns the cell states as a `uint8` array of shape (width, height)."""
+        return self.states.copy()
+
+    def set_states(self, states):
+        """Replaces the cell states of the whole grid.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        self.states[:] = states
+
+    def step(self):
+        """Updates the environment based on the current cell states."""
+        next_states = bytearray(len(self.buffer))
+        for row in self.grid:
+            for cell in row:
+                next_states[cell.index] = cell.decide_next_state(self)
+
+        self.buffer[:] = next_states
+
+
+class ArrayEnvironment:
+    """
+    Environment which keeps the cell states in a single `uint8` array instead of a grid of `Cell` objects.
+    The neighbour counts are computed for the whole grid at once by the neighbour finder and the life strategy
+    is applied as a table lookup, so both need to implement their vectorized methods
+    (`count_neighbours` and `next_states`). Multi-state rules (see `RuleStrategy`) are supported, the decaying
+    states being kept in the same array.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, initial_state=None):
+        self.width = width
+        self.height = height
+        self.strategy = life_strategy or ConwayStrategy()
+        self.finder = neighbour_finder or StandardNeighbourFinder()
+        # the initial states are set directly, so a memory mapped checkpoint is never copied into a random grid
+        if initial_state is None:
+            self.states = np.random.randint(0, 2, size=(width, height), dtype=np.uint8)
+        else:
+            self.set_states(initial_state)
+
+    def get_states(self):
+        """Returns the cell states as a `uint8` array of shape (width, height)."""
+        return self.states
+
+    def set_states(self, states):
+        """Replaces the cell states of the whole grid. A copy-on-write memory map (such as the states of a
+        `Checkpoint`) is used as it is, so it is only read when stepping.
+        :param states: A 2D array-like of shape (width, height)"""
+        if not (isinstance(states, np.memmap) and states.mode == "c"):
+            states = np.array(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        self.states = states
+
     def step(self):
         """Updates the environment based on the current cell states."""
-        next_states = [
-            [cell.decide_next_state(self) for cell in row]
-            for row in self.grid
-        ]
-        for x, row in enumerate(self.grid):
-            for y, cell in enumerate(row):
-                cell.state = next_states[x][y]
+        counts = self.finder.count_neighbours(self.strategy.alive(self.states))
+        self.states = self.strategy.next_states(self.states, counts)
@@ -0,0 +1,257 @@
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from conway.conway.dir_util import make_file_dir_if_not_exist
+
+# Same ends as matplotlib's default colour map (viridis), so the exports look like the `run` animations
+DEFAULT_PALETTE = [(68, 1, 84), (253, 231, 37)]
+
+
+def state_palette(number_of_states: int = 2):
+    """Returns a palette for a rule with the given number of states: the default dead and alive colours, with the
+    decaying states of multi-state rules fading from the alive colour back towards the dead one
+    :param number_of_states: The number of states of the rule (see `RuleStrategy.number_of_states`)"""
+    if number_of_states <= 2:
+        return list(DEFAULT_PALETTE)
+
+    dead, alive = np.array(DEFAULT_PALETTE, dtype=float)
+    # the last decaying state stays distinguishable from the dead cells
+    fading = np.linspace(0.25, 0.85, number_of_states - 2)[::-1, None]
+    decaying = np.rint(dead + (alive - dead) * fading).astype(int)
+    return list(DEFAULT_PALETTE) + [tuple(int(c) for c in colour) for colour in decaying]
+
+
+def to_pixels(states, scale: int = 1):
+    """Turns a 2D array of states into palette indices, each cell becoming a scale x scale square
+    :param states: A 2D array of cell states (the palette indices)
+    :param scale: The size in pixels of a cell"""
+    pixels = np.asarray(states, dtype=np.uint8)
+    if scale > 1:
+        pixels = np.repeat(np.repeat(pixels, scale, axis=0), scale, axis=1)
+    return pixels
+
+
+class FrameWriter:
+    """
+    Writes the generations of a simulation to a file one at a time, so frames are never all kept in memory.
+    Can be used as a context manager, closing the file at the end.
+    """
+    def __init__(self, filename):
+        make_file_dir_if_not_exist(filename)
+        self.file = open(filename, "wb")
+        self.frames = 0
+
+    def write(self, states):
+        """Appends a frame
+        :param states: A 2D array of cell states"""
+        raise NotImplementedError
+
+    def close(self):
+        """Finishes the file"""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PaletteFrameWriter(FrameWriter):
+    def __init__(self, filename, palette=None, scale: int = 1, frame_interval: int = 100):
+        """
+        :param filename: The file to write
+        :param palette: The RGB colour of every state (state i is drawn with palette[i])
+        :param scale: The size in pixels of a cell
+        :param frame_interval: The time between frames, in milliseconds
+        """
+        super().__init__(filename)
+        self.palette = np.array(palette or DEFAULT_PALETTE, dtype=np.uint8)
+        self.scale = scale
+        self.frame_interval = frame_interval
+        self.shape = None
+
+    def write(self, states):
+        pixels = to_pixels(states, self.scale)
+        if self.shape is None:
+            self.shape = pixels.shape
+            self._write_header()
+        elif pixels.shape != self.shape:
+            raise ValueError(f"Expected frames of shape {self.shape}, got {pixels.shape}")
+
+        self._write_frame(pixels)
+        self.frames += 1
+
+    def _write_header(self):
+        raise NotImplementedError
+
+    def _write_frame(self, pixels):
+        raise NotImplementedError
+
+
+class GifWriter(PaletteFrameWriter):
+    """
+    Animated GIF writer. The pixels are stored with plain (uncompressed) LZW codes, emitting a clear code before the
+    code table grows, which can be produced for a whole frame at once with NumPy.
+    """
+    def _write_header(self):
+        rows, columns = self.shape
+        # the smallest power of two table holding the palette (GIF needs at least 2 bits per code)
+        self.code_size = max(2, int(np.ceil(np.log2(len(self.palette)))))
+
+        colour_table = np.zeros((1 << self.code_size, 3), dtype=np.uint8)
+        colour_table[:len(self.palette)] = self.palette
+
+        self.file.write(b"GIF89a")
+        self.file.write(struct.pack("<HHBBB", columns, rows, 0x80 | (self.code_size - 1), 0, 0))
+        self.file.write(colour_table.tobytes())
+        # loop forever
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def _write_frame(self, pixels):
+        rows, columns = self.shape
+        delay = max(1, round(self.frame_interval / 10))
+
+        self.file.write(struct.pack("<BBBBHBB", 0x21, 0xf9, 4, 0, delay, 0, 0))
+        self.file.write(struct.pack("<BHHHHB", 0x2c, 0, 0, columns, rows, 0))
+        self.file.write(bytes([self.code_size]))
+        self.file.write(self._encode(pixels.ravel()))
+
+    def _encode(self, indices):
+        clear = 1 << self.code_size
+        end = clear + 1
+        width = self.code_size + 1
+        # after a clear code the decoder adds a table entry per code, so clear again before it needs a wider code
+        run = clear - 2
+
+        count = len(indices)
+        runs = -(-count // run)
+        padded = np.zeros(runs * run, dtype=np.uint16)
+        padded[:count] = indices
+
+        body = np.empty((runs, run + 1), dtype=np.uint16)
+        body[:, 0] = clear
+        body[:, 1:] = padded.reshape(runs, run)
+        # drop the padding of the last run
+        codes = np.append(body.ravel()[:count + runs], np.uint16(end))
+
+        bits = ((codes[:, None] >> np.arange(width, dtype=np.uint16)) & 1).astype(np.uint8)
+        data = np.packbits(bits.ravel(), bitorder="little")
+
+        # data sub-blocks of at most 255 bytes, each prefixed by its length
+        blocks = -(-len(data) // 255)
+        last = len(data) - (blocks - 1) * 255
+        chunked = np.zeros((blocks, 256), dtype=np.uint8)
+        chunked[:, 0] = 255
+        chunked[-1, 0] = last
+        padded_data = np.zeros(blocks * 255, dtype=np.uint8)
+        padded_data[:len(data)] = data
+        chunked[:, 1:] = padded_data.reshape(blocks, 255)
+        flat = chunked.ravel()[:blocks * 256 - (255 - last)]
+
+        return flat.tobytes() + b"\x00"
+
+    def close(self):
+        if not self.file.closed and self.shape is not None:
+            self.file.write(b"\x3b")
+        super().close()
+
+
+class ApngWriter(PaletteFrameWriter):
+    """
+    Animated PNG writer (palette based, zlib compressed). The number of frames is patched in the header
+    when the writer is closed.
+    """
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)) + kind + data +
+                        struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    def _write_header(self):
+        rows, columns = self.shape
+        self.sequence = 0
+
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", columns, rows, 8, 3, 0, 0, 0))
+        self._chunk(b"PLTE", self.palette.tobytes())
+        self.actl_position = self.file.tell()
+        self._chunk(b"acTL", struct.pack(">II", 0, 0))
+
+    def _write_frame(self, pixels):
+        rows, columns = self.shape
+
+        self._chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, columns, rows, 0, 0,
+                                         self.frame_interval, 1000, 0, 0))
+        self.sequence += 1
+
+        # every row starts with its filter type (0, none)
+        scanlines = np.zeros((rows, columns + 1), dtype=np.uint8)
+        scanlines[:, 1:] = pixels
+        data = zlib.compress(scanlines.tobytes())
+
+        if self.frames == 0:
+            self._chunk(b"IDAT", data)
+        else:
+            self._chunk(b"fdAT", struct.pack(">I", self.sequence) + data)
+            self.sequence += 1
+
+    def close(self):
+        if not self.file.closed and self.shape is not None:
+            self._chunk(b"IEND", b"")
+            self.file.seek(self.actl_position)
+            self._chunk(b"acTL", struct.pack(">II", self.frames, 0))
+        super().close()
+
+
+class NpyWriter(FrameWriter):
+    """
+    Writes the raw states to a `.npy` file holding a (frames, width, height) `uint8` array, which can be read back
+    lazily with `np.load(filename, mmap_mode='r')`. The number of frames is patched in the header when the writer is
+    closed.
+    """
+    HEADER_SIZE = 128
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.shape = None
+
+    def _write_header(self):
+        header = "{'descr': '|u1', 'fortran_order': False, 'shape': (%d, %d, %d), }" % ((self.frames,) + self.shape)
+        header = header.ljust(self.HEADER_SIZE - 10 - 1) + "\n"
+        self.file.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1"))
+
+    def write(self, states):
+        states = np.asarray(states, dtype=np.uint8)
+        if self.shape is None:
+            self.shape = states.shape
+            self._write_header()
+        elif states.shape != self.shape:
+            raise ValueError(f"Expected frames of shape {self.shape}, got {states.shape}")
+
+        self.file.write(np.ascontiguousarray(states).tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self.file.closed and self.shape is not None:
+            self.file.seek(0)
+            self._write_header()
+        super().close()
+
+
+def open_frame_writer(filename, palette=None, scale: int = 1, frame_interval: int = 100) -> FrameWriter:
+    """Returns the frame writer matching the extension of the file (.gif, .png/.apng or .npy)
+    :param filename: The file to write
+    :param palette: The RGB colour of every state (ignored for .npy)
+    :param scale: The size in pixels of a cell (ignored for .npy)
+    :param frame_interval: The time between frames, in milliseconds (ignored for .npy)"""
+    extension = Path(filename).suffix.lower()
+    if extension == ".npy":
+        return NpyWriter(filename)
+    if extension == ".gif":
+        return GifWriter(filename, palette, scale, frame_interval)
+    if extension in (".png", ".apng"):
+        return ApngWriter(filename, palette, scale, frame_interval)
+
+    raise ValueError(f"Unsupported frame file extension {extension!r}")
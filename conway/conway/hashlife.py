@@ -0,0 +1,259 @@
+import numpy as np
+
+from conway.conway.neighbour import ToroidNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
+
+
+class Node:
+    """
+    Square quadtree node of side 2 ** level. The leaves (level 0) are single cells, whose population is their state.
+    Nodes are canonical (see `HashLifeEnvironment.join`), so two nodes holding the same pattern are the same object
+    and can be compared and hashed by identity.
+    """
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+class HashLifeEnvironment:
+    """
+    Environment implementing Gosper's HashLife algorithm: the universe is a quadtree of canonical (hash-consed) nodes
+    and the future of every node is memoized, so repetitive patterns can be advanced by billions of generations.
+
+    The universe is unbounded: the grid of (width, height) is a window onto it, starting at the origin, and the
+    patterns leaving the window keep evolving outside of it. For patterns staying inside the window this matches
+    the `StandardNeighbourFinder`; the toroidal neighbourhood cannot be represented.
+    The life strategy needs a birth/survival `table` (see `RuleStrategy`) without birth on 0 neighbours.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, max_nodes: int = 1 << 20,
+                 initial_state=None):
+        """
+        :param width: The number of rows of the window
+        :param height: The number of columns of the window
+        :param neighbour_finder: Must not be a `ToroidNeighbourFinder` (the universe is unbounded)
+        :param life_strategy: The rule used to compute the next state of the cells
+        :param max_nodes: When the number of canonical nodes exceeds it, the nodes (and memoized results)
+        not reachable from the current universe are discarded
+        :param initial_state: A 2D array-like of shape (width, height) with the initial cell states of the window
+        (random if not set)
+        """
+        if isinstance(neighbour_finder, ToroidNeighbourFinder):
+            raise NotImplementedError("The HashLife environment does not support toroidal edges")
+
+        self.width = width
+        self.height = height
+        self.finder = neighbour_finder
+        self.strategy = life_strategy or ConwayStrategy()
+        self.max_nodes = max_nodes
+
+        table = getattr(self.strategy, "table", None)
+        if table is None:
+            raise NotImplementedError(f"{type(self.strategy).__name__} has no birth/survival table")
+        if len(table) != 2:
+            raise NotImplementedError("The HashLife environment only supports two state rules")
+        if table[0][0]:
+            raise ValueError("Rules with birth on 0 neighbours cannot be run on an unbounded universe")
+        self.table = table
+
+        self.off = Node(None, None, None, None, 0, 0)
+        self.on = Node(None, None, None, None, 0, 1)
+        self.nodes = {}
+        self.results = {}
+        self.empty_nodes = [self.off]
+
+        self.generation = 0
+        self._states = None
+        if initial_state is None:
+            initial_state = np.random.randint(0, 2, size=(width, height), dtype=np.uint8)
+        self.set_states(initial_state)
+
+    @property
+    def population(self):
+        """The number of alive cells in the whole universe"""
+        return self.root.population
+
+    def join(self, nw, ne, sw, se):
+        """Returns the canonical node with the given quadrants"""
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            population = nw.population + ne.population + sw.population + se.population
+            node = Node(nw, ne, sw, se, nw.level + 1, population)
+            self.nodes[key] = node
+        return node
+
+    def empty(self, level):
+        """Returns the empty node of the given level"""
+        while len(self.empty_nodes) <= level:
+            e = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(e, e, e, e))
+        return self.empty_nodes[level]
+
+    def centre(self, node):
+        """Returns the node one level up with the given node in its middle"""
+        e = self.empty(node.level - 1)
+        return self.join(self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+                         self.join(e, node.sw, e, e), self.join(node.se, e, e, e))
+
+    def _is_padded(self, node):
+        """Checks whether all the alive cells of the node are in its central quarter"""
+        return (node.nw.population == node.nw.se.se.population and
+                node.ne.population == node.ne.sw.sw.population and
+                node.sw.population == node.sw.ne.ne.population and
+                node.se.population == node.se.nw.nw.population)
+
+    def _life_4x4(self, node):
+        """Computes the centre 2x2 of a 4x4 node after one generation"""
+        cells = [
+            [node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+            [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+            [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+            [node.sw.sw, node.sw.se, node.se.sw, node.se.se],
+        ]
+        states = [[cell.population for cell in row] for row in cells]
+
+        quadrants = []
+        for x in (1, 2):
+            for y in (1, 2):
+                alive = sum(states[x + dx][y + dy] for dx in (-1, 0, 1) for dy in (-1, 0, 1)) - states[x][y]
+                quadrants.append(self.on if self.table[states[x][y]][alive] else self.off)
+
+        return self.join(*quadrants)
+
+    def successor(self, node, j):
+        """Returns the central half of the node advanced by 2 ** j generations (j is capped to level - 2)"""
+        j = min(j, node.level - 2)
+        if node.population == 0:
+            return node.nw
+
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join = self.join
+
+            # 9 overlapping sub-nodes of half the size, advanced by up to 2 ** j generations
+            c1 = self.successor(nw, j)
+            c2 = self.successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self.successor(ne, j)
+            c4 = self.successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self.successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self.successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self.successor(sw, j)
+            c8 = self.successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self.successor(se, j)
+
+            if j < node.level - 2:
+                # the time was already spent: only keep the centre of the combined sub-nodes
+                result = join(join(c1.se, c2.sw, c4.ne, c5.nw), join(c2.se, c3.sw, c5.ne, c6.nw),
+                              join(c4.se, c5.sw, c7.ne, c8.nw), join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = join(self.successor(join(c1, c2, c4, c5), j), self.successor(join(c2, c3, c5, c6), j),
+                              self.successor(join(c4, c5, c7, c8), j), self.successor(join(c5, c6, c8, c9), j))
+
+        self.results[key] = result
+        return result
+
+    def advance(self, generations: int):
+        """Advances the universe by the given number of generations, jumping by the powers of two making it up
+        :param generations: The number of generations (can be astronomically large)"""
+        j = 0
+        while generations > 0:
+            if generations & 1:
+                # with the pattern in the central quarter and 2 ** j <= size / 8, nothing can leave the central half
+                while self.root.level < j + 3 or not self._is_padded(self.root):
+                    self._grow()
+                offset = 1 << (self.root.level - 2)
+                self.root = self.successor(self.root, j)
+                self.origin = (self.origin[0] + offset, self.origin[1] + offset)
+                self.generation += 1 << j
+
+                if len(self.nodes) > self.max_nodes:
+                    self.collect_garbage()
+            generations >>= 1
+            j += 1
+
+        self._states = None
+
+    def step(self):
+        """Updates the environment based on the current cell states."""
+        self.advance(1)
+
+    def _grow(self):
+        offset = 1 << (self.root.level - 1)
+        self.root = self.centre(self.root)
+        self.origin = (self.origin[0] - offset, self.origin[1] - offset)
+
+    def collect_garbage(self):
+        """Discards the canonical nodes and memoized results which are not reachable from the current universe"""
+        reachable = set()
+        pending = [self.root] + self.empty_nodes
+        while pending:
+            node = pending.pop()
+            if node.level == 0 or node in reachable:
+                continue
+            reachable.add(node)
+            pending.extend((node.nw, node.ne, node.sw, node.se))
+
+        self.nodes = {key: node for key, node in self.nodes.items() if node in reachable}
+        self.results = {key: node for key, node in self.results.items()
+                        if key[0] in reachable and (node.level == 0 or node in reachable)}
+
+    def _build(self, states, level):
+        if level == 0:
+            return self.on if states[0, 0] else self.off
+        if not states.any():
+            return self.empty(level)
+
+        half = 1 << (level - 1)
+        return self.join(self._build(states[:half, :half], level - 1), self._build(states[:half, half:], level - 1),
+                         self._build(states[half:, :half], level - 1), self._build(states[half:, half:], level - 1))
+
+    def get_states(self):
+        """Returns the cell states of the window as a `uint8` array of shape (width, height)."""
+        if self._states is None:
+            states = np.zeros((self.width, self.height), dtype=np.uint8)
+            self._render(self.root, self.origin[0], self.origin[1], states)
+            self._states = states
+        return self._states
+
+    def _render(self, node, x, y, states):
+        size = 1 << node.level
+        if node.population == 0 or x >= self.width or y >= self.height or x + size <= 0 or y + size <= 0:
+            return
+        if node.level == 0:
+            states[x, y] = 1
+            return
+
+        half = size >> 1
+        self._render(node.nw, x, y, states)
+        self._render(node.ne, x, y + half, states)
+        self._render(node.sw, x + half, y, states)
+        self._render(node.se, x + half, y + half, states)
+
+    def set_states(self, states):
+        """Replaces the universe with the given cell states placed at the origin.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        level = max(3, int(np.ceil(np.log2(max(self.width, self.height)))))
+        padded = np.zeros((1 << level, 1 << level), dtype=np.uint8)
+        padded[:self.width, :self.height] = states
+
+        self.root = self._build(padded, level)
+        self.origin = (0, 0)
+        self._states = None
+        self.collect_garbage()
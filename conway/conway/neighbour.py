@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class NeighbourFinder:
     def find_neighbours(self, x, y, env):
         """
@@ -9,6 +12,16 @@ class NeighbourFinder:
         """
         raise NotImplementedError
 
+    def count_neighbours(self, states):
+        """
+        Returns the number of alive neighbours for every position of a states array (the vectorized
+        counterpart of `find_neighbours`)
+        :param states: A 2D array of cell states (0 or 1), indexed the same way as the environment grid, or a stack
+        of such arrays (the grids being the last 2 dimensions)
+        :return: An array of the same shape holding the alive neighbours count of each cell
+        """
+        raise NotImplementedError
+
 
 class StandardNeighbourFinder(NeighbourFinder):
     def find_neighbours(self, x, y, env):
@@ -23,6 +36,22 @@ class StandardNeighbourFinder(NeighbourFinder):
 
         return neighbors
 
+    def count_neighbours(self, states):
+        *stack, width, height = states.shape
+
+        # Surround the grid with a border of dead cells, so that the cells outside the grid never count
+        padded = np.zeros((*stack, width + 2, height + 2), dtype=np.uint8)
+        padded[..., 1:-1, 1:-1] = states
+
+        counts = np.zeros(states.shape, dtype=np.uint8)
+        for dx in range(3):
+            for dy in range(3):
+                if dx == 1 and dy == 1:
+                    continue
+                counts += padded[..., dx:dx + width, dy:dy + height]
+
+        return counts
+
 
 class ToroidNeighbourFinder(NeighbourFinder):
     """
@@ -37,4 +66,13 @@ class ToroidNeighbourFinder(NeighbourFinder):
 
             neighbors.append(env.grid[nx][ny])
 
-        return neighbors
\ No newline at end of file
+        return neighbors
+
+    def count_neighbours(self, states):
+        states = states.astype(np.uint8, copy=False)
+
+        # Rolling the rows first and then the columns of the partial sums covers all 8 directions
+        rows = states + np.roll(states, 1, axis=-2) + np.roll(states, -1, axis=-2)
+        counts = rows + np.roll(rows, 1, axis=-1) + np.roll(rows, -1, axis=-1)
+
+        return counts - states
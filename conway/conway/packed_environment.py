@@ -0,0 +1,170 @@
+import numpy as np
+
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
+
+WORD_BITS = 64
+
+
+def pack_states(states):
+    """Packs a 2D array of cell states into rows of `uint64` words (bit j of word k holds column 64 * k + j)
+    :param states: A 2D array of cell states (0 or 1)
+    :return: A `uint64` array of shape (rows, ceil(columns / 64))"""
+    states = np.asarray(states, dtype=np.uint8)
+    rows, columns = states.shape
+    words = -(-columns // WORD_BITS)
+
+    packed = np.zeros((rows, words * 8), dtype=np.uint8)
+    packed[:, :-(-columns // 8)] = np.packbits(states, axis=1, bitorder='little')
+
+    return packed.view('<u8').astype(np.uint64)
+
+
+def unpack_states(words, columns):
+    """Unpacks rows of `uint64` words back into a 2D `uint8` array of cell states
+    :param words: The packed rows, as returned by `pack_states`
+    :param columns: The number of columns of the unpacked array"""
+    as_bytes = np.ascontiguousarray(words, dtype='<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, count=columns, bitorder='little')
+
+
+class BitPackedEnvironment:
+    """
+    Environment which stores every row of the grid as bit-packed `uint64` words (a single bit per cell).
+    A step computes the neighbour counts of 64 cells at once with bitwise full adders and applies the
+    birth/survival table of the life strategy as a boolean function of the count bits.
+    Only the standard (bounded) and the toroidal neighbourhoods are supported, and the life strategy needs
+    a birth/survival `table` (see `RuleStrategy`).
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, initial_state=None):
+        self.width = width
+        self.height = height
+        self.strategy = life_strategy or ConwayStrategy()
+        self.finder = neighbour_finder or StandardNeighbourFinder()
+
+        if isinstance(self.finder, ToroidNeighbourFinder):
+            self.toroidal = True
+        elif isinstance(self.finder, StandardNeighbourFinder):
+            self.toroidal = False
+        else:
+            raise NotImplementedError(f"{type(self.finder).__name__} is not supported by the bit-packed environment")
+
+        if getattr(self.strategy, "table", None) is None:
+            raise NotImplementedError(f"{type(self.strategy).__name__} has no birth/survival table")
+        if self.strategy.number_of_states != 2:
+            raise NotImplementedError("The bit-packed environment only supports two state rules")
+
+        self.word_count = -(-height // WORD_BITS)
+        # bits past the last column of the last word are kept at 0
+        self.last_word_mask = np.uint64((1 << (height - (self.word_count - 1) * WORD_BITS)) - 1)
+        self.last_bit = np.uint64((height - 1) % WORD_BITS)
+
+        self._states = None
+        if initial_state is None:
+            self.words = np.random.randint(0, 2 ** 64, size=(width, self.word_count), dtype=np.uint64)
+            self.words[:, -1] &= self.last_word_mask
+        else:
+            self.set_states(initial_state)
+
+    def get_states(self):
+        """Returns the cell states as a `uint8` array of shape (width, height). The array is only unpacked
+        when requested, and then reused until the next step."""
+        if self._states is None:
+            self._states = unpack_states(self.words, self.height)
+        return self._states
+
+    def set_states(self, states):
+        """Replaces the cell states of the whole grid.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        self.words = pack_states(states)
+        self._states = None
+
+    def _shift_columns(self, words):
+        """Returns the rows shifted by one column in both directions: `west` holds, for every cell, the state of
+        the cell on its left, and `east` the state of the cell on its right."""
+        one = np.uint64(1)
+        high = np.uint64(WORD_BITS - 1)
+
+        west = words << one
+        west[:, 1:] |= words[:, :-1] >> high
+
+        east = words >> one
+        east[:, :-1] |= words[:, 1:] << high
+
+        if self.toroidal:
+            first_column = words[:, 0] & one
+            last_column = (words[:, -1] >> self.last_bit) & one
+            west[:, 0] |= last_column
+            east[:, -1] |= first_column << self.last_bit
+
+        return west, east
+
+    def _shift_rows(self, words):
+        """Returns the rows above (`north`) and below (`south`) every row."""
+        if self.toroidal:
+            return np.roll(words, 1, axis=0), np.roll(words, -1, axis=0)
+
+        north = np.zeros_like(words)
+        north[1:] = words[:-1]
+        south = np.zeros_like(words)
+        south[:-1] = words[1:]
+        return north, south
+
+    def count_bits(self):
+        """Computes the number of alive neighbours of every cell as 4 bit-planes (1, 2, 4 and 8)"""
+        west, east = self._shift_columns(self.words)
+
+        # sum of the 3 horizontal cells of every row (0-3) and of the 2 side cells (0-2)
+        row_ones = west ^ self.words ^ east
+        row_twos = (west & self.words) | (east & (west ^ self.words))
+        side_ones = west ^ east
+        side_twos = west & east
+
+        north_ones, south_ones = self._shift_rows(row_ones)
+        north_twos, south_twos = self._shift_rows(row_twos)
+
+        # ones: full adder over the three weight-1 bits
+        ones = north_ones ^ side_ones ^ south_ones
+        carry = (north_ones & side_ones) | (south_ones & (north_ones ^ side_ones))
+
+        # twos: the three weight-2 bits plus the carry of the ones
+        partial = north_twos ^ side_twos ^ south_twos
+        fours_a = (north_twos & side_twos) | (south_twos & (north_twos ^ side_twos))
+        twos = partial ^ carry
+        fours_b = partial & carry
+
+        fours = fours_a ^ fours_b
+        eights = fours_a & fours_b
+
+        return ones, twos, fours, eights
+
+    def step(self):
+        """Updates the environment based on the current cell states."""
+        planes = self.count_bits()
+        alive = self.words
+        table = self.strategy.table
+
+        result = np.zeros_like(alive)
+        for count in range(9):
+            birth, survival = table[0][count], table[1][count]
+            if not birth and not survival:
+                continue
+
+            matches = np.full_like(alive, np.uint64(2 ** 64 - 1))
+            for bit, plane in enumerate(planes):
+                matches &= plane if count >> bit & 1 else ~plane
+
+            if birth and survival:
+                result |= matches
+            elif birth:
+                result |= matches & ~alive
+            else:
+                result |= matches & alive
+
+        result[:, -1] &= self.last_word_mask
+        self.words = result
+        self._states = None
@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
+
+
+def step_band(current, following, start, stop, toroidal, strategy):
+    """Computes the next states of the rows [start, stop) of `current` into `following`. The rows just above and
+    below the band (the halo) are read from `current`, which is shared by all the bands.
+    :param current: The (width, height) array with the current states
+    :param following: The (width, height) array receiving the next states
+    :param start: The first row of the band
+    :param stop: The row after the last row of the band
+    :param toroidal: Whether the edges of the grid wrap around
+    :param strategy: The life strategy (needs `next_states`)"""
+    width, height = current.shape
+    band = np.zeros((stop - start + 2, height + 2), dtype=np.uint8)
+
+    if toroidal:
+        band[:, 1:-1] = current[np.arange(start - 1, stop + 1) % width]
+        band[:, 0] = band[:, -2]
+        band[:, -1] = band[:, 1]
+    else:
+        first, last = max(start - 1, 0), min(stop + 1, width)
+        band[first - start + 1:last - start + 1, 1:-1] = current[first:last]
+
+    rows, columns = stop - start, height
+    alive = strategy.alive(band)
+    counts = np.zeros((rows, columns), dtype=np.uint8)
+    for dx in range(3):
+        for dy in range(3):
+            if dx == 1 and dy == 1:
+                continue
+            counts += alive[dx:dx + rows, dy:dy + columns]
+
+    following[start:stop] = strategy.next_states(band[1:-1, 1:-1], counts)
+
+
+# State of the pool processes, attached to the shared buffers once by `_attach_buffers`
+_worker = {}
+
+
+def _attach_buffers(names, shape, toroidal, strategy):
+    memories = [SharedMemory(name=name) for name in names]
+    _worker["memories"] = memories
+    _worker["buffers"] = [np.ndarray(shape, dtype=np.uint8, buffer=memory.buf) for memory in memories]
+    _worker["toroidal"] = toroidal
+    _worker["strategy"] = strategy
+
+
+def _step_shared_band(source, start, stop):
+    buffers = _worker["buffers"]
+    step_band(buffers[source], buffers[1 - source], start, stop, _worker["toroidal"], _worker["strategy"])
+
+
+class ParallelEnvironment:
+    """
+    Environment which splits the grid into row bands stepped concurrently, either by threads (NumPy releases the GIL
+    while computing) or by processes working on two shared memory buffers (the current and the next states).
+    Every band reads the rows bordering it (its halo) from the current states, and all the bands of a generation
+    are finished before the next one starts, so the results match the serial environments.
+    Only the standard (bounded) and the toroidal neighbourhoods are supported.
+    Call `close` (or use it as a context manager) to stop the workers and release the shared memory.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, workers: int = None,
+                 use_processes: bool = False, initial_state=None):
+        """
+        :param width: The number of rows of the grid
+        :param height: The number of columns of the grid
+        :param neighbour_finder: The strategy used to find the neighbours of a cell (handles the grid edges)
+        :param life_strategy: The rule used to compute the next state of the cells (needs `next_states`)
+        :param workers: The number of threads or processes (and of row bands), by default the number of CPUs
+        :param use_processes: If set to `True`, the bands are stepped by a process pool over shared memory,
+        otherwise by a thread pool
+        :param initial_state: A 2D array-like of shape (width, height) with the initial cell states (random if not set)
+        """
+        self.width = width
+        self.height = height
+        self.strategy = life_strategy or ConwayStrategy()
+        self.finder = neighbour_finder or StandardNeighbourFinder()
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+
+        if isinstance(self.finder, ToroidNeighbourFinder):
+            self.toroidal = True
+        elif isinstance(self.finder, StandardNeighbourFinder):
+            self.toroidal = False
+        else:
+            raise NotImplementedError(f"{type(self.finder).__name__} is not supported by the parallel environment")
+
+        bounds = np.linspace(0, width, min(self.workers, width) + 1).astype(int)
+        self.bands = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+        self.memories = None
+        if use_processes:
+            self.memories = [SharedMemory(create=True, size=max(width * height, 1)) for _ in range(2)]
+            self.buffers = [np.ndarray((width, height), dtype=np.uint8, buffer=memory.buf) for memory in self.memories]
+            self.pool = Pool(self.workers, initializer=_attach_buffers,
+                             initargs=([memory.name for memory in self.memories], (width, height),
+                                       self.toroidal, self.strategy))
+        else:
+            self.buffers = [np.zeros((width, height), dtype=np.uint8) for _ in range(2)]
+            self.pool = ThreadPoolExecutor(self.workers)
+
+        self.current = 0
+        if initial_state is None:
+            self.buffers[0][:] = np.random.randint(0, 2, size=(width, height), dtype=np.uint8)
+        else:
+            self.set_states(initial_state)
+
+    def get_states(self):
+        """Returns the cell states as a `uint8` array of shape (width, height)."""
+        return self.buffers[self.current]
+
+    def set_states(self, states):
+        """Replaces the cell states of the whole grid.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        self.buffers[self.current][:] = states
+
+    def step(self):
+        """Updates the environment based on the current cell states."""
+        if self.use_processes:
+            self.pool.starmap(_step_shared_band, [(self.current, start, stop) for start, stop in self.bands])
+        else:
+            current, following = self.buffers[self.current], self.buffers[1 - self.current]
+            futures = [self.pool.submit(step_band, current, following, start, stop, self.toroidal, self.strategy)
+                       for start, stop in self.bands]
+            for future in futures:
+                future.result()
+
+        self.current = 1 - self.current
+
+    def close(self):
+        """Stops the workers and releases the shared memory (closing it again does nothing)"""
+        if self.pool is None:
+            return
+        if self.use_processes:
+            self.pool.close()
+            self.pool.join()
+            # the states stay available after closing
+            self.buffers = [buffer.copy() for buffer in self.buffers]
+            for memory in self.memories:
+                memory.close()
+                memory.unlink()
+            self.memories = None
+        else:
+            self.pool.shutdown()
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
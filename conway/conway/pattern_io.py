@@ -0,0 +1,318 @@
+import re
+from pathlib import Path
+
+import numpy as np
+
+from conway.conway.dir_util import make_file_dir_if_not_exist
+
+RLE_TOKEN = re.compile(r"(\d*)([a-zA-Z.$!])")
+RLE_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?")
+RLE_LINE_LENGTH = 70
+# how many characters of an RLE body are decoded at once
+RLE_CHUNK_SIZE = 1 << 20
+
+
+def _rle_state(tag):
+    """Returns the state of an RLE cell tag: b/o for two state rules, ./A-X for multi-state ones"""
+    if tag in "b.":
+        return 0
+    if tag == "o":
+        return 1
+    if "A" <= tag <= "X":
+        return ord(tag) - ord("A") + 1
+    raise ValueError(f"Unsupported RLE tag {tag!r}")
+
+
+def _decode_rle_chunk(body, states, row, column):
+    """Decodes a piece of RLE body into the states array, starting at (row, column), with NumPy operations over
+    all of its runs at once
+    :return: The (row, column) where the chunk ends"""
+    tokens = RLE_TOKEN.findall(body)
+    tags = [tag for _, tag in tokens]
+    if "!" in tags:
+        tags = tags[:tags.index("!")]
+        tokens = tokens[:len(tags)]
+    if not tags:
+        return row, column
+
+    counts = np.array([int(count) if count else 1 for count, _ in tokens], dtype=np.int64)
+    is_newline = np.array([tag == "$" for tag in tags])
+    cell_counts = np.where(is_newline, 0, counts)
+    newline_counts = counts - cell_counts
+
+    # the row of every run, and its column: the cells advanced since the last line end of the chunk, or since the
+    # chunk start when the run continues the line of the previous chunk
+    rows = row + np.cumsum(newline_counts) - newline_counts
+    advanced = np.cumsum(cell_counts) - cell_counts
+    line_start = np.maximum.accumulate(np.where(is_newline, advanced, 0))
+    after_newline = np.cumsum(is_newline) > 0
+    columns = np.where(after_newline, advanced - line_start, column + advanced)
+
+    values = np.array([0 if tag == "$" else _rle_state(tag) for tag in tags], dtype=np.uint8)
+    alive = values > 0
+    lengths = cell_counts[alive]
+    run_offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    states[np.repeat(rows[alive], lengths), np.repeat(columns[alive], lengths) + run_offsets] = \
+        np.repeat(values[alive], lengths)
+
+    if is_newline.any():
+        last = len(tags) - 1 - int(np.argmax(is_newline[::-1]))
+        return int(row + newline_counts.sum()), int(cell_counts[last + 1:].sum())
+    return row, int(column + cell_counts.sum())
+
+
+def read_rle(filename):
+    """Reads an RLE pattern file, decoding its body in chunks straight into the states array
+    :param filename: The RLE file
+    :return: A tuple composed of the (rows, columns) `uint8` states array and the rule (`None` if not given)"""
+    with open(filename) as file:
+        states, rule = None, None
+        row, column = 0, 0
+        pending = []
+        pending_size = 0
+
+        for line in file:
+            line = line.strip()
+            if states is None:
+                if not line or line.startswith("#"):
+                    continue
+                header = RLE_HEADER.match(line)
+                if header is None:
+                    raise ValueError(f"{filename} does not start with an RLE header")
+                states = np.zeros((int(header.group(2)), int(header.group(1))), dtype=np.uint8)
+                rule = header.group(3)
+                continue
+
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= RLE_CHUNK_SIZE or "!" in line:
+                body = "".join(pending)
+                # a run count at the very end of the chunk belongs to the next one
+                digits = len(body) - len(body.rstrip("0123456789"))
+                pending = [body[len(body) - digits:]] if digits else []
+                pending_size = digits
+                row, column = _decode_rle_chunk(body[:len(body) - digits], states, row, column)
+                if "!" in line:
+                    break
+
+        if states is None:
+            raise ValueError(f"{filename} does not contain an RLE pattern")
+        if pending:
+            _decode_rle_chunk("".join(pending), states, row, column)
+
+    return states, rule
+
+
+def _rle_tag(state):
+    return "b" if state == 0 else "o" if state == 1 else chr(ord("A") + state - 1)
+
+
+def _rle_multi_state_tag(state):
+    return "." if state == 0 else chr(ord("A") + state - 1)
+
+
+def write_rle(filename, states, rule: str = "B3/S23"):
+    """Writes a states array as an RLE pattern file
+    :param filename: The RLE file (can include directories)
+    :param states: A 2D array of cell states, the rows of the pattern being its first dimension
+    :param rule: The rule written in the header"""
+    states = np.asarray(states, dtype=np.uint8)
+    rows, columns = states.shape
+    tag = _rle_tag if states.max(initial=0) <= 1 else _rle_multi_state_tag
+
+    items = []
+    newlines = 0
+    for row in states:
+        alive = np.flatnonzero(row)
+        if len(alive):
+            # the empty rows are only written as the line ends before the next non-empty row
+            if newlines:
+                items.append(f"{newlines if newlines > 1 else ''}$")
+                newlines = 0
+
+            row = row[:alive[-1] + 1]
+            starts = np.concatenate([[0], np.flatnonzero(np.diff(row)) + 1])
+            lengths = np.diff(np.concatenate([starts, [len(row)]]))
+            for start, length in zip(starts, lengths):
+                items.append(f"{length if length > 1 else ''}{tag(int(row[start]))}")
+        newlines += 1
+    items.append("!")
+
+    make_file_dir_if_not_exist(filename)
+    with open(filename, "w") as file:
+        file.write(f"x = {columns}, y = {rows}, rule = {rule}\n")
+        line = ""
+        for item in items:
+            if len(line) + len(item) > RLE_LINE_LENGTH:
+                file.write(line + "\n")
+                line = ""
+            line += item
+        file.write(line + "\n")
+
+
+def read_plaintext(filename):
+    """Reads a plaintext (.cells) pattern file, where 'O' marks alive cells and lines starting with '!' are comments
+    :return: The (rows, columns) `uint8` states array"""
+    with open(filename) as file:
+        lines = [line.rstrip("\r\n") for line in file if not line.startswith("!")]
+
+    columns = max((len(line) for line in lines), default=0)
+    characters = np.array([list(line.ljust(columns, ".")) for line in lines], dtype="<U1").reshape(len(lines), columns)
+    return (characters == "O").astype(np.uint8)
+
+
+def write_plaintext(filename, states, name: str = None):
+    """Writes a states array as a plaintext (.cells) pattern file
+    :param filename: The pattern file (can include directories)
+    :param states: A 2D array of cell states (0 or 1)
+    :param name: The pattern name, written as a comment"""
+    characters = np.where(np.asarray(states) > 0, "O", ".")
+
+    make_file_dir_if_not_exist(filename)
+    with open(filename, "w") as file:
+        if name is not None:
+            file.write(f"!Name: {name}\n")
+        for row in characters:
+            file.write("".join(row).rstrip(".") + "\n")
+
+
+def read_macrocell(filename):
+    """Reads a Macrocell (.mc) pattern file (Golly's quadtree format, two state rules only) and renders it
+    :return: A tuple composed of the (rows, columns) `uint8` states array, cropped to the alive cells, and the rule
+    (`None` if not given)"""
+    rule = None
+    # every node is (level, children) for the quadtree nodes or (3, 8x8 array) for the leaves, index 0 is empty
+    nodes = [None]
+
+    with open(filename) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("[M2]"):
+                continue
+            if line.startswith("#"):
+                if line.startswith("#R"):
+                    rule = line[2:].strip()
+                continue
+
+            if line[0] in ".*$":
+                leaf = np.zeros((8, 8), dtype=np.uint8)
+                for x, row in enumerate(line.split("$")[:8]):
+                    leaf[x, [y for y, character in enumerate(row) if character == "*"]] = 1
+                nodes.append((3, leaf))
+            else:
+                level, *children = (int(value) for value in line.split())
+                if level == 1:
+                    raise ValueError("Multi-state Macrocell files are not supported")
+                nodes.append((level, children))
+
+    if len(nodes) == 1:
+        return np.zeros((0, 0), dtype=np.uint8), rule
+
+    root_level = nodes[-1][0]
+    size = 1 << root_level
+    states = np.zeros((size, size), dtype=np.uint8)
+
+    pending = [(len(nodes) - 1, 0, 0)]
+    while pending:
+        index, x, y = pending.pop()
+        if index == 0:
+            continue
+        level, content = nodes[index]
+        if level == 3:
+            states[x:x + 8, y:y + 8] = content
+            continue
+
+        half = 1 << (level - 1)
+        for child, (dx, dy) in zip(content, ((0, 0), (0, half), (half, 0), (half, half))):
+            pending.append((child, x + dx, y + dy))
+
+    xs, ys = np.nonzero(states)
+    if len(xs) == 0:
+        return np.zeros((0, 0), dtype=np.uint8), rule
+    return states[xs.min():xs.max() + 1, ys.min():ys.max() + 1].copy(), rule
+
+
+def write_macrocell(filename, states, rule: str = "B3/S23"):
+    """Writes a states array as a Macrocell (.mc) pattern file, identical sub-squares being written once
+    :param filename: The pattern file (can include directories)
+    :param states: A 2D array of cell states (0 or 1)
+    :param rule: The rule written in the header"""
+    states = np.asarray(states, dtype=np.uint8)
+    level = max(3, int(np.ceil(np.log2(max(states.shape + (1,))))))
+    padded = np.zeros((1 << level, 1 << level), dtype=np.uint8)
+    padded[:states.shape[0], :states.shape[1]] = states
+
+    lines = []
+    indices = {}
+
+    def node(square, level):
+        if not square.any():
+            return 0
+        if level == 3:
+            rows = ["".join("*" if cell else "." for cell in row).rstrip(".") for row in square]
+            while rows and not rows[-1]:
+                rows.pop()
+            key = "".join(row + "$" for row in rows)
+        else:
+            half = 1 << (level - 1)
+            children = (node(square[:half, :half], level - 1), node(square[:half, half:], level - 1),
+                        node(square[half:, :half], level - 1), node(square[half:, half:], level - 1))
+            key = f"{level} " + " ".join(str(child) for child in children)
+
+        if key not in indices:
+            lines.append(key)
+            indices[key] = len(lines)
+        return indices[key]
+
+    node(padded, level)
+
+    make_file_dir_if_not_exist(filename)
+    with open(filename, "w") as file:
+        file.write("[M2] (conway)\n")
+        file.write(f"#R {rule}\n")
+        file.write("\n".join(lines) + "\n")
+
+
+def read_pattern(filename):
+    """Reads a pattern file, choosing the format from the extension (.rle, .cells/.txt or .mc)
+    :return: A tuple composed of the states array and the rule (`None` if the format does not store it)"""
+    extension = Path(filename).suffix.lower()
+    if extension == ".rle":
+        return read_rle(filename)
+    if extension in (".cells", ".txt"):
+        return read_plaintext(filename), None
+    if extension == ".mc":
+        return read_macrocell(filename)
+
+    raise ValueError(f"Unsupported pattern file extension {extension!r}")
+
+
+def write_pattern(filename, states, rule: str = "B3/S23"):
+    """Writes a pattern file, choosing the format from the extension (.rle, .cells/.txt or .mc)"""
+    extension = Path(filename).suffix.lower()
+    if extension == ".rle":
+        write_rle(filename, states, rule)
+    elif extension in (".cells", ".txt"):
+        write_plaintext(filename, states)
+    elif extension == ".mc":
+        write_macrocell(filename, states, rule)
+    else:
+        raise ValueError(f"Unsupported pattern file extension {extension!r}")
+
+
+def place_pattern(states, pattern, x: int = 0, y: int = 0):
+    """Copies a pattern into a states array with its top left corner at (x, y), clipping what falls outside
+    :param states: The (width, height) states array, modified in place
+    :param pattern: The 2D pattern array
+    :param x: The row of the top left corner of the pattern
+    :param y: The column of the top left corner of the pattern"""
+    pattern = np.asarray(pattern, dtype=np.uint8)
+    width, height = states.shape
+
+    x_start, y_start = max(x, 0), max(y, 0)
+    x_stop, y_stop = min(x + pattern.shape[0], width), min(y + pattern.shape[1], height)
+    if x_start >= x_stop or y_start >= y_stop:
+        return states
+
+    states[x_start:x_stop, y_start:y_stop] = pattern[x_start - x:x_stop - x, y_start - y:y_stop - y]
+    return states
@@ -1,46 +1,143 @@
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.animation import FuncAnimation
 
-from conway.conway.cell import Cell
+from conway.conway.checkpoint import Checkpoint
+from conway.conway.cycle import CycleDetector
 from conway.conway.dir_util import make_file_dir_if_not_exist
-from conway.conway.environment import Environment
-from conway.conway.strategy import ConwayStrategy
-from conway.conway.neighbour import StandardNeighbourFinder
+from conway.conway.environment import Environment, ArrayEnvironment
+from conway.conway.frame_writer import open_frame_writer, state_palette
+from conway.conway.pattern_io import read_pattern, write_pattern, place_pattern
+from conway.conway.strategy import ConwayStrategy, RuleStrategy
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
 
 
 class ConwaySimulator:
     def __init__(self, width, height, life_strategy=ConwayStrategy(), initial_state=None,
-                 neighbour_finder=StandardNeighbourFinder()):
+                 neighbour_finder=StandardNeighbourFinder(), environment_type=Environment):
+        """
+        :param width: The number of rows of the grid
+        :param height: The number of columns of the grid
+        :param life_strategy: The rule used to compute the next state of the cells
+        :param initial_state: A 2D array-like of shape (width, height) with the initial cell states (random if not set)
+        :param neighbour_finder: The strategy used to find the neighbours of a cell (handles the grid edges)
+        :param environment_type: The environment implementation used to store and step the grid (`Environment`
+        keeps a `Cell` object per position, `ArrayEnvironment` keeps a single array and steps it vectorized,
+        `BitPackedEnvironment` keeps a single bit per cell, `ActiveRegionEnvironment` only recomputes the regions
+        near the last changes, `HashLifeEnvironment` can `advance` an unbounded universe by billions of generations,
+        `SparseEnvironment` only stores the alive cells of an unbounded universe and renders a viewport of it)
+        """
         self.width = width
         self.height = height
         self.strategy = life_strategy
-        self.environment = Environment(width, height, neighbour_finder)
-        self.initialize_cells(initial_state)
+        self.finder = neighbour_finder
+        # the environment starts from the initial state, so resuming a checkpoint never builds a random grid first
+        self.environment = environment_type(width, height, neighbour_finder, life_strategy, initial_state=initial_state)
 
-        # Animation
+        self.generation = 0
+        self.checkpoint = None
+        self.checkpoint_every = None
+
+        # Animation (matplotlib is only imported and set up when the simulation is run)
+        self.fig = None
+
+    def __init_figure(self):
+        from matplotlib import pyplot as plt
+        from matplotlib.colors import ListedColormap
 
         self.fig, self.ax = plt.subplots()
 
         states = self.__get_cells_states()
 
-        self.mat = self.ax.matshow(states, vmin=0, vmax=1, origin='upper')
+        number_of_states = self.__number_of_states()
+        if number_of_states > 2:
+            colour_map = ListedColormap(np.array(state_palette(number_of_states)) / 255)
+            self.mat = self.ax.matshow(states, cmap=colour_map, vmin=0, vmax=number_of_states - 1, origin='upper')
+        else:
+            self.mat = self.ax.matshow(states, vmin=0, vmax=1, origin='upper')
         self.text = self.ax.text(0.5, 0.5, "", bbox={'facecolor': 'white', 'alpha': 0.5, 'pad': 2})
 
     def initialize_cells(self, initial_state):
 
         if initial_state is not None:
-
-            for x in range(self.height):
-                for y in range(self.width):
-                    state = int(initial_state[x][y])
-                    self.environment.grid[x][y] = Cell(x, y, state)
-                    self.environment.grid[x][y].strategy = self.strategy
+            self.environment.set_states(initial_state)
+
+    def place_pattern(self, pattern, x: int = 0, y: int = 0):
+        """Copies a pattern into the grid with its top left corner at (x, y) (what falls outside is clipped)
+        :param pattern: A 2D array-like of states or a pattern file (.rle, .cells/.txt or .mc)
+        :param x: The row of the top left corner of the pattern
+        :param y: The column of the top left corner of the pattern"""
+        if isinstance(pattern, str):
+            pattern, _ = read_pattern(pattern)
+
+        states = np.array(self.__get_cells_states(), dtype=np.uint8)
+        self.environment.set_states(place_pattern(states, pattern, x, y))
+
+    def save_pattern(self, filename: str):
+        """Saves the current generation to a pattern file (.rle, .cells/.txt or .mc, chosen from the extension)"""
+        write_pattern(filename, self.__get_cells_states(), getattr(self.strategy, "rule", "B3/S23"))
+
+    def step(self):
+        """Advances the simulation by one generation, writing a checkpoint if one is due"""
+        self.environment.step()
+        self.generation += 1
+
+        if self.checkpoint is not None and self.generation % self.checkpoint_every == 0:
+            self.checkpoint.write(self.__get_cells_states(), self.generation)
+
+    def checkpoint_to(self, filename: str, every: int = 1000, tile_size: int = 256):
+        """Periodically saves the simulation to a checkpoint file, from which it can be resumed (see `resume`).
+        The rule and the edges of the grid are saved too, so the life strategy needs to be a `RuleStrategy` and the
+        neighbour finder a `StandardNeighbourFinder` or a `ToroidNeighbourFinder`.
+        :param filename: The checkpoint file (can include directories)
+        :param every: The number of generations between checkpoints
+        :param tile_size: The size of the square tiles compared between two checkpoints (only the changed tiles
+        are rewritten)"""
+        rule = getattr(self.strategy, "rule", None)
+        if rule is None:
+            raise ValueError(f"{type(self.strategy).__name__} cannot be saved in a checkpoint (it has no rule string)")
+        if not isinstance(self.finder, (StandardNeighbourFinder, ToroidNeighbourFinder)):
+            raise ValueError(f"{type(self.finder).__name__} cannot be saved in a checkpoint")
+
+        self.checkpoint = Checkpoint.create(filename, self.width, self.height, rule,
+                                            isinstance(self.finder, ToroidNeighbourFinder), tile_size)
+        self.checkpoint_every = every
+        self.checkpoint.write(self.__get_cells_states(), self.generation)
+
+    @classmethod
+    def resume(cls, filename: str, environment_type=ArrayEnvironment, every: int = 1000):
+        """Creates a simulator from a checkpoint file, which keeps being checkpointed to. The file is memory
+        mapped, so the states are only read from it when the environment uses them.
+        :param filename: The checkpoint file
+        :param environment_type: The environment implementation used to step the grid
+        :param every: The number of generations between checkpoints"""
+        checkpoint = Checkpoint.open(filename)
+        finder = ToroidNeighbourFinder() if checkpoint.toroidal else StandardNeighbourFinder()
+
+        simulator = cls(checkpoint.width, checkpoint.height, RuleStrategy(checkpoint.rule), checkpoint.states,
+                        finder, environment_type)
+        simulator.generation = checkpoint.generation
+        simulator.checkpoint = checkpoint
+        simulator.checkpoint_every = every
+        return simulator
+
+    def close(self):
+        """Releases the resources of the environment (the workers of a `ParallelEnvironment`) and of the checkpoint
+        file, if any (closing it again does nothing)"""
+        if hasattr(self.environment, "close"):
+            self.environment.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+            self.checkpoint = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __update(self, data):
 
         if data != 0:
-            self.environment.step()
+            self.step()
         states = self.__get_cells_states()
 
         self.mat.set_data(states)
@@ -48,14 +145,21 @@ class ConwaySimulator:
         return [self.mat]
 
     def __get_cells_states(self):
-        states = np.array([[cell.state for cell in row] for row in self.environment.grid])
-        return states
+        return self.environment.get_states()
+
+    def __number_of_states(self):
+        return getattr(self.strategy, "number_of_states", 2)
 
-    def run(self, frame_interval:int=100, iterations:int=40, filename:str=None) -> FuncAnimation:
+    def run(self, frame_interval:int=100, iterations:int=40, filename:str=None) -> "FuncAnimation":
         """Runs and returns the simulation for the given number of iterations, spacing the frames at the given time interval. If the filename parameter is not null, it will be saved to that file.
         :param frame_interval The interval between frames
         :param iterations The number of iterations to run the simulation for
         :param filename The name of the file where to save the simulation video (can include directories)"""
+        from matplotlib.animation import FuncAnimation
+
+        if self.fig is None:
+            self.__init_figure()
+
         animation = FuncAnimation(self.fig, self.__update, interval=frame_interval, save_count=iterations)
 
         if filename is not None:
@@ -63,3 +167,43 @@ class ConwaySimulator:
             animation.save(filename)
 
         return animation
+
+    def export(self, filename: str, iterations: int = 40, every: int = 1, scale: int = 1, palette=None,
+               frame_interval: int = 100):
+        """Runs the simulation without rendering it through matplotlib, streaming the frames straight to a file.
+        The format is chosen from the extension: .gif, .png/.apng (animated PNG) or .npy (the raw states, as a
+        (frames, width, height) array).
+        :param filename: The name of the file where to save the frames (can include directories)
+        :param iterations: The number of iterations to run the simulation for
+        :param every: Only write every n-th generation
+        :param scale: The size in pixels of a cell
+        :param palette: The RGB colour of every state (state i is drawn with palette[i]), by default the one of
+        `state_palette` for the number of states of the rule
+        :param frame_interval: The interval between frames, in milliseconds
+        :return: The number of frames written"""
+        palette = palette or state_palette(self.__number_of_states())
+        with open_frame_writer(filename, palette, scale, frame_interval * every) as writer:
+            for generation in range(iterations):
+                if generation != 0:
+                    self.step()
+                if generation % every == 0:
+                    writer.write(self.__get_cells_states())
+
+            return writer.frames
+
+    def run_until_stable(self, iterations: int = 1000, max_history: int = 1024):
+        """Steps the simulation (without rendering it) until the grid repeats a previous state or the number of
+        iterations is reached.
+        :param iterations: The maximum number of generations to run
+        :param max_history: How many of the last generations are remembered (longer periods are not detected)
+        :return: A tuple composed of the number of generations run, the period of the final cycle (1 for a still
+        life) and the number of generations before entering it (the last two are `None` if no cycle was found)"""
+        detector = CycleDetector(max_history)
+
+        for generation in range(iterations + 1):
+            if generation != 0:
+                self.step()
+            if detector.observe(generation, self.__get_cells_states()):
+                return generation, detector.period, detector.transient
+
+        return iterations, None, None
@@ -0,0 +1,205 @@
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from conway.conway.cycle import CycleDetector
+from conway.conway.dir_util import make_file_dir_if_not_exist
+from conway.conway.neighbour import StandardNeighbourFinder, ToroidNeighbourFinder
+from conway.conway.strategy import RuleStrategy
+
+# Common objects of Conway's Life ash, as rows of cells ('O' alive), named in the census
+KNOWN_OBJECTS = {
+    "block": ["OO", "OO"],
+    "beehive": [".OO.", "O..O", ".OO."],
+    "loaf": [".OO.", "O..O", ".O.O", "..O."],
+    "boat": ["OO.", "O.O", ".O."],
+    "ship": ["OO.", "O.O", ".OO"],
+    "tub": [".O.", "O.O", ".O."],
+    "pond": [".OO.", "O..O", "O..O", ".OO."],
+    "blinker": ["OOO"],
+    "glider": [".O.", "..O", "OOO"],
+}
+
+
+def seed_soup(index: int, width: int, height: int, density: float = 0.5, seed: int = 0):
+    """Returns the initial states of a random soup. The generator is seeded with both the search seed and the soup
+    index, so any soup of a search can be recreated on its own (e.g. to replay it with `ConwaySimulator`).
+    :param index: The index of the soup in the search
+    :param width: The number of rows of the soup
+    :param height: The number of columns of the soup
+    :param density: The probability of a cell to be alive
+    :param seed: The seed of the search"""
+    rng = np.random.default_rng([seed, index])
+    return (rng.random((width, height)) < density).astype(np.uint8)
+
+
+def canonical_key(cells) -> str:
+    """Returns a key identifying an object up to translation, rotation and reflection: the smallest encoding of
+    its 8 orientations, written as the bounding box size followed by the hex of the packed cells.
+    :param cells: A 2D array cropped to the bounding box of the object"""
+    keys = []
+    for rotation in range(4):
+        rotated = np.rot90(cells, rotation)
+        for orientation in (rotated, rotated[::-1]):
+            keys.append(f"{orientation.shape[0]}x{orientation.shape[1]}:" +
+                        np.packbits(orientation.ravel()).tobytes().hex())
+    return min(keys)
+
+
+def _pattern(rows):
+    return np.array([[1 if c == "O" else 0 for c in row] for row in rows], dtype=np.uint8)
+
+
+OBJECT_NAMES = {canonical_key(_pattern(rows)): name for name, rows in KNOWN_OBJECTS.items()}
+
+
+def census(states) -> Counter:
+    """Splits the alive cells into objects (groups of cells connected through any of their 8 neighbours) and
+    counts the objects by kind. Known objects are counted by name, the others by their canonical key.
+    :param states: A 2D array of cell states"""
+    alive = set(zip(*np.nonzero(states)))
+    objects = Counter()
+
+    while alive:
+        pending = [alive.pop()]
+        component = []
+        while pending:
+            x, y = pending.pop()
+            component.append((x, y))
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    neighbour = (x + dx, y + dy)
+                    if neighbour in alive:
+                        alive.remove(neighbour)
+                        pending.append(neighbour)
+
+        xs, ys = np.array(component).T
+        cells = np.zeros((xs.max() - xs.min() + 1, ys.max() - ys.min() + 1), dtype=np.uint8)
+        cells[xs - xs.min(), ys - ys.min()] = 1
+
+        key = canonical_key(cells)
+        objects[OBJECT_NAMES.get(key, key)] += 1
+
+    return objects
+
+
+def search_soups(soups: int, width: int, height: int, life_strategy=None, neighbour_finder=None,
+                 generations: int = 1000, density: float = 0.5, seed: int = 0, max_history: int = 256,
+                 batch_size: int = 1024):
+    """Runs random soups until each of them stabilises (repeats a previous state) or the number of generations is
+    reached. The soups of a batch are stacked in a single (soups, width, height) array stepped at once, the
+    stabilised soups being dropped from the stack.
+    :param soups: The number of soups
+    :param width: The number of rows of a soup
+    :param height: The number of columns of a soup
+    :param life_strategy: The rule of the soups (needs `next_states`), Conway's rules by default
+    :param neighbour_finder: The neighbourhood (needs `count_neighbours`), bounded by default
+    :param generations: The maximum number of generations run per soup
+    :param density: The probability of a cell to be alive in the initial soups
+    :param seed: The seed of the search (see `seed_soup`)
+    :param max_history: How many of the last generations are remembered by the cycle detection
+    :param batch_size: How many soups are stepped together
+    :return: A dictionary of columns: `soup`, `generations` (run before stabilising), `period` and `transient`
+    (-1 when the soup did not stabilise), `population` (a (soups, generations + 1) array, extended along the final
+    cycle for stabilised soups) and the census as the `census_soup`, `census_object` and `census_count` columns
+    """
+    strategy = life_strategy or RuleStrategy("B3/S23")
+    finder = neighbour_finder or StandardNeighbourFinder()
+
+    stop = np.full(soups, generations, dtype=np.int64)
+    period = np.full(soups, -1, dtype=np.int64)
+    transient = np.full(soups, -1, dtype=np.int64)
+    population = np.zeros((soups, generations + 1), dtype=np.uint32)
+    census_soup, census_object, census_count = [], [], []
+
+    def finish(index, states):
+        if period[index] > 0:
+            # the population keeps following the final cycle
+            following = np.arange(stop[index] + 1, generations + 1)
+            cycle_generation = transient[index] + (following - transient[index]) % period[index]
+            population[index, following] = population[index, cycle_generation]
+
+        for name, count in sorted(census(states).items()):
+            census_soup.append(index)
+            census_object.append(name)
+            census_count.append(count)
+
+    for batch_start in range(0, soups, batch_size):
+        indices = np.arange(batch_start, min(batch_start + batch_size, soups))
+        states = np.stack([seed_soup(int(index), width, height, density, seed) for index in indices])
+        detectors = [CycleDetector(max_history) for _ in indices]
+
+        for generation in range(generations + 1):
+            if generation != 0:
+                states = strategy.next_states(states, finder.count_neighbours(strategy.alive(states)))
+
+            population[indices, generation] = strategy.alive(states).sum(axis=(1, 2))
+
+            keep = np.ones(len(indices), dtype=bool)
+            for position, index in enumerate(indices):
+                detector = detectors[position]
+                if detector.observe(generation, states[position]):
+                    stop[index], period[index], transient[index] = generation, detector.period, detector.transient
+                    finish(index, states[position])
+                    keep[position] = False
+
+            if not keep.all():
+                states = states[keep]
+                indices = indices[keep]
+                detectors = [detector for detector, kept in zip(detectors, keep) if kept]
+            if len(indices) == 0:
+                break
+
+        for position, index in enumerate(indices):
+            finish(index, states[position])
+
+    return {
+        "soup": np.arange(soups),
+        "generations": stop,
+        "period": period,
+        "transient": transient,
+        "population": population,
+        "census_soup": np.array(census_soup, dtype=np.int64),
+        "census_object": np.array(census_object, dtype=str),
+        "census_count": np.array(census_count, dtype=np.int64),
+    }
+
+
+def save_results(filename: str, results, **metadata):
+    """Saves the columns of a search (and its parameters) into a compressed `.npz` file"""
+    make_file_dir_if_not_exist(filename)
+    np.savez_compressed(filename, **results, **{key: np.array(value) for key, value in metadata.items()})
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Runs a batch of random soups and records their statistics")
+    parser.add_argument("--soups", type=int, default=1000, help="The number of soups")
+    parser.add_argument("--width", type=int, default=16, help="The number of rows of a soup")
+    parser.add_argument("--height", type=int, default=16, help="The number of columns of a soup")
+    parser.add_argument("--rule", default="B3/S23", help="The rule, as a B/S rule string")
+    parser.add_argument("--toroidal", action="store_true", help="Wrap the edges of the soups around")
+    parser.add_argument("--generations", type=int, default=1000, help="The maximum number of generations per soup")
+    parser.add_argument("--density", type=float, default=0.5, help="The initial probability of a cell to be alive")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the search")
+    parser.add_argument("--batch-size", type=int, default=1024, help="How many soups are stepped together")
+    parser.add_argument("--output", default="out/soups.npz", help="The file where the results are saved")
+    args = parser.parse_args(arguments)
+
+    finder = ToroidNeighbourFinder() if args.toroidal else StandardNeighbourFinder()
+    results = search_soups(args.soups, args.width, args.height, RuleStrategy(args.rule), finder, args.generations,
+                           args.density, args.seed, batch_size=args.batch_size)
+    save_results(args.output, results, rule=args.rule, toroidal=args.toroidal, width=args.width,
+                 height=args.height, density=args.density, seed=args.seed)
+
+    objects = Counter()
+    for name, count in zip(results["census_object"], results["census_count"]):
+        objects[name] += int(count)
+    stabilised = int((results["period"] > 0).sum())
+    print(f"{stabilised}/{args.soups} soups stabilised, saved to {args.output}")
+    for name, count in objects.most_common(10):
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import numpy as np
+
+from conway.conway.neighbour import ToroidNeighbourFinder
+from conway.conway.strategy import ConwayStrategy
+
+# (x, y) coordinates are packed into a single int64 key, x in the high 32 bits and y (shifted to be positive) in the
+# low 32 bits, so that sets of cells can be handled as sorted integer arrays
+Y_OFFSET = 1 << 31
+Y_MASK = (1 << 32) - 1
+
+NEIGHBOUR_OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)], dtype=np.int64)
+
+
+def encode(x, y):
+    return (np.asarray(x, dtype=np.int64) << 32) + (np.asarray(y, dtype=np.int64) + Y_OFFSET)
+
+
+def decode(keys):
+    return keys >> 32, (keys & Y_MASK) - Y_OFFSET
+
+
+class SparseEnvironment:
+    """
+    Environment for an unbounded universe which only stores the coordinates of the alive cells (as a sorted array
+    of packed coordinates), so its memory is proportional to the population rather than to the bounding box.
+    A step counts the contributions of every alive cell to its neighbours, so only the cells next to alive
+    cells are ever considered.
+
+    The (width, height) grid is a viewport onto the universe starting at `origin`, which is what `get_states` and
+    `set_states` work with (and thus what the simulator renders). The universe being unbounded, the toroidal
+    neighbourhood is not supported.
+    The life strategy needs a birth/survival `table` (see `RuleStrategy`) without birth on 0 neighbours.
+    """
+    def __init__(self, width, height, neighbour_finder=None, life_strategy=None, origin=(0, 0), initial_state=None):
+        """
+        :param width: The number of rows of the viewport
+        :param height: The number of columns of the viewport
+        :param neighbour_finder: Must not be a `ToroidNeighbourFinder` (the universe is unbounded)
+        :param life_strategy: The rule used to compute the next state of the cells
+        :param origin: The coordinates of the top left cell of the viewport
+        :param initial_state: A 2D array-like of shape (width, height) with the initial cell states of the viewport
+        (random if not set)
+        """
+        if isinstance(neighbour_finder, ToroidNeighbourFinder):
+            raise NotImplementedError("The sparse environment does not support toroidal edges")
+
+        self.width = width
+        self.height = height
+        self.finder = neighbour_finder
+        self.strategy = life_strategy or ConwayStrategy()
+        self.origin = origin
+
+        table = getattr(self.strategy, "table", None)
+        if table is None:
+            raise NotImplementedError(f"{type(self.strategy).__name__} has no birth/survival table")
+        if len(table) != 2:
+            raise NotImplementedError("The sparse environment only supports two state rules")
+        if table[0][0]:
+            raise ValueError("Rules with birth on 0 neighbours cannot be run on an unbounded universe")
+        self.table = table
+
+        self.keys = np.empty(0, dtype=np.int64)
+        self.generation = 0
+        if initial_state is None:
+            initial_state = np.random.randint(0, 2, size=(width, height), dtype=np.uint8)
+        self.set_states(initial_state)
+
+    @property
+    def population(self):
+        """The number of alive cells in the whole universe"""
+        return len(self.keys)
+
+    def get_cells(self):
+        """Returns the coordinates of all the alive cells as two arrays (x, y)"""
+        return decode(self.keys)
+
+    def set_cells(self, x, y):
+        """Replaces the universe with the given alive cells
+        :param x: The x coordinates of the alive cells
+        :param y: The y coordinates of the alive cells"""
+        self.keys = np.unique(encode(x, y))
+
+    def bounding_box(self):
+        """Returns the (min_x, min_y, max_x, max_y) corners of the alive cells, or `None` for an empty universe"""
+        if len(self.keys) == 0:
+            return None
+
+        x, y = decode(self.keys)
+        return int(x.min()), int(y.min()), int(x.max()), int(y.max())
+
+    def get_states(self):
+        """Returns the cell states of the viewport as a `uint8` array of shape (width, height)."""
+        x, y = decode(self.keys)
+        x = x - self.origin[0]
+        y = y - self.origin[1]
+        visible = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+
+        states = np.zeros((self.width, self.height), dtype=np.uint8)
+        states[x[visible], y[visible]] = 1
+        return states
+
+    def set_states(self, states):
+        """Replaces the universe with the given cell states placed in the viewport.
+        :param states: A 2D array-like of shape (width, height)"""
+        states = np.asarray(states, dtype=np.uint8)
+        if states.shape != (self.width, self.height):
+            raise ValueError(f"Expected states of shape {(self.width, self.height)}, got {states.shape}")
+
+        x, y = np.nonzero(states)
+        self.set_cells(x + self.origin[0], y + self.origin[1])
+
+    def step(self):
+        """Updates the environment based on the current cell states."""
+        x, y = decode(self.keys)
+        neighbour_keys = encode((x[:, None] + NEIGHBOUR_OFFSETS[:, 0]).ravel(),
+                                (y[:, None] + NEIGHBOUR_OFFSETS[:, 1]).ravel())
+        candidates, counts = np.unique(neighbour_keys, return_counts=True)
+
+        alive = np.isin(candidates, self.keys, assume_unique=True)
+        next_keys = candidates[self.table[alive.astype(np.uint8), counts] == 1]
+
+        if self.table[1][0]:
+            # alive cells without any alive neighbour never show up among the candidates
+            isolated = self.keys[~np.isin(self.keys, candidates, assume_unique=True)]
+            next_keys = np.union1d(next_keys, isolated)
+
+        self.keys = next_keys
+        self.generation += 1
@@ -1,8 +1,125 @@
+from functools import lru_cache
+
+import numpy as np
+
+
 class LifeStrategy:
+    # 0 is dead and 1 alive, the states above are decaying states (which do not count as alive neighbours)
+    number_of_states = 2
 
     def next_state(self, cell, env):
         raise NotImplementedError
 
+    def alive(self, states):
+        """Returns the array of the cells counting as alive neighbours (1) for a states array"""
+        if self.number_of_states == 2:
+            return states
+        return (states == 1).view(np.uint8)
+
+    def next_states(self, states, counts):
+        """Computes the next state of every cell at once (the vectorized counterpart of `next_state`)
+        :param states: A 2D array with the current cell states
+        :param counts: A 2D array, of the same shape, with the number of alive neighbours of each cell
+        :return: A 2D `uint8` array with the next cell states
+        """
+        raise NotImplementedError
+
+
+# Life-like rules commonly referenced by name, in B/S notation
+NAMED_RULES = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "seeds": "B2/S",
+    "day&night": "B3678/S34678",
+    "replicator": "B1357/S1357",
+    "life without death": "B3/S012345678",
+    "diamoeba": "B35678/S5678",
+    "2x2": "B36/S125",
+    "morley": "B368/S245",
+    "maze": "B3/S12345",
+    # Generations rules, with decaying states
+    "brian's brain": "B2/S/C3",
+    "star wars": "B2/S345/C4",
+    "frogs": "B34/S12/C3",
+    "bloomerang": "B34678/S234/C24",
+}
+
+
+@lru_cache(maxsize=None)
+def parse_rule(rule: str):
+    """Parses a Golly-style rule string into a read-only transition table, where table[state][alive_neighbours]
+    is the next state of a cell. Both "B36/S23" (in any order and case) and the legacy "23/36" (survival/birth)
+    notations are accepted, as well as the names in `NAMED_RULES`. Generations rules have a third part with
+    the number of states ("B2/S/C3", or "/2/3" in the legacy notation): an alive cell which does not survive
+    goes through the decaying states before dying, and decaying cells cannot be born again.
+    The result is cached, so parsing the same rule again costs a dictionary lookup.
+    :param rule: The rule string
+    :return: A `uint8` array of shape (number of states, 9)
+    """
+    rule = NAMED_RULES.get(rule.strip().lower(), rule).strip().upper()
+    parts = rule.split("/")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid rule {rule!r}, expected the B/S notation (e.g. 'B3/S23' or 'B2/S/C3')")
+
+    if all(part.startswith(("B", "S", "C", "G")) for part in parts):
+        conditions = {part[0].replace("G", "C"): part[1:] for part in parts}
+        if set(conditions) != ({"B", "S"} if len(parts) == 2 else {"B", "S", "C"}):
+            raise ValueError(f"Invalid rule {rule!r}, it needs exactly one B and one S part (and one C part)")
+        birth, survival, states = conditions["B"], conditions["S"], conditions.get("C", "2")
+    else:
+        survival, birth, states = (parts + ["2"])[:3]
+
+    if not states.isdigit() or int(states) < 2 or int(states) > 256:
+        raise ValueError(f"Invalid rule {rule!r}, the number of states must be between 2 and 256")
+    states = int(states)
+
+    table = np.zeros((states, 9), dtype=np.uint8)
+    # a cell which does not survive starts decaying (with 2 states it dies right away)
+    table[1] = 2 % states
+    for state in range(2, states):
+        table[state] = (state + 1) % states
+
+    for state, digits in ((0, birth), (1, survival)):
+        for digit in digits:
+            if digit not in "012345678":
+                raise ValueError(f"Invalid rule {rule!r}, neighbour counts must be between 0 and 8")
+            table[state][int(digit)] = 1
+
+    table.flags.writeable = False
+    return table
+
+
+class RuleStrategy(LifeStrategy):
+    """
+    Life-like rule given as a rule string (e.g. RuleStrategy("B36/S23") for HighLife, or RuleStrategy("B2/S/C3")
+    for the Generations rule Brian's Brain). The rule is compiled into a transition table once, which drives both
+    the per-cell and the vectorized paths.
+    """
+    def __init__(self, rule: str):
+        self.table = parse_rule(rule)
+        self.number_of_states = len(self.table)
+        self.rule = "B" + "".join(str(n) for n in np.flatnonzero(self.table[0])) + \
+                    "/S" + "".join(str(n) for n in np.flatnonzero(self.table[1] == 1))
+        if self.number_of_states > 2:
+            self.rule += f"/C{self.number_of_states}"
+        # plain nested tuples are faster to index than the array from Python code
+        self.lookup = tuple(tuple(int(v) for v in row) for row in self.table)
+
+    def next_state(self, cell, env):
+        neighbors = cell.perceive(env)
+        if self.number_of_states == 2:
+            alive_neighbors = sum(n.state for n in neighbors)
+        else:
+            alive_neighbors = sum(n.state == 1 for n in neighbors)
+
+        return self.lookup[cell.state][alive_neighbors]
+
+    def next_states(self, states, counts):
+        return self.table[states, counts]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.rule!r})"
+
 
 """
 1. Any live cell with two or three live neighbours lives on to the next generation.
@@ -10,31 +127,28 @@ class LifeStrategy:
 3. Any live cell with more than three live neighbours dies, as if by overpopulation.
 4. Any dead cell with exactly three live neighbours becomes a live cell, as if by reproduction.
 """
-class ConwayStrategy(LifeStrategy):
-    def next_state(self, cell, env):
-        neighbors = cell.perceive(env)
-        alive_neighbors = sum(n.state for n in neighbors)
-
-        if cell.state == 1 and alive_neighbors in (2, 3):
-            return 1
-        elif cell.state == 1 and (alive_neighbors > 3 or alive_neighbors < 2):
-            return 0
-        elif cell.state == 0 and alive_neighbors == 3:
-            return 1
-        else:
-            return 0
+class ConwayStrategy(RuleStrategy):
+    def __init__(self):
+        super().__init__("B3/S23")
 
 
-class HighLifeStrategy(LifeStrategy):
-    def next_state(self, cell, env):
-        neighbors = cell.perceive(env)
-        alive_neighbors = sum(n.state for n in neighbors)
-
-        if cell.state == 1 and alive_neighbors in (2, 3):
-            return 1
-        elif cell.state == 1 and (alive_neighbors > 3 or alive_neighbors < 2):
-            return 0
-        elif cell.state == 0 and alive_neighbors in (3, 6):
-            return 1
-        else:
-            return 0
\ No newline at end of file
+"""
+Same as Conway's rules, except that a dead cell with six live neighbours also becomes a live cell.
+"""
+class HighLifeStrategy(RuleStrategy):
+    def __init__(self):
+        super().__init__("B36/S23")
+
+
+"""
+Generations rule where only dead cells with exactly two alive neighbours are born and every alive cell
+decays (through one dying state) on the next generation.
+"""
+class BriansBrainStrategy(RuleStrategy):
+    def __init__(self):
+        super().__init__("B2/S/C3")
+
+
+class StarWarsStrategy(RuleStrategy):
+    def __init__(self):
+        super().__init__("B2/S345/C4")
@@ -0,0 +1,122 @@
+import argparse
+import json
+import math
+import platform
+import time
+
+import numpy as np
+
+from swarm.particle_swarm.dir_util import make_file_dir_if_not_exist
+from swarm.particle_swarm.objective import FunctionObjective, sphere
+from swarm.particle_swarm.particle_swarm_simulator import ParticleSwarm
+from swarm.particle_swarm.spatial_hash import SpatialHash, Crowding
+
+SUITE_SIZES = (10_000, 100_000, 1_000_000)
+
+# The largest number of particles the all-pairs baseline is run on, past which it takes minutes
+MAX_BRUTE_FORCE = 20_000
+
+
+def brute_force_pairs(positions, radius: float, chunk_size: int = 1024) -> int:
+    """Counts the pairs of particles closer than the radius by computing all the distances, by chunks of particles"""
+    count = 0
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        distances = np.linalg.norm(chunk[:, None] - positions[None, start:], axis=2)
+        # only the pairs (i, j) with i < j
+        count += int(np.triu(distances <= radius, 1).sum())
+    return count
+
+
+def seconds(function, repeats: int = 3) -> float:
+    """Returns the shortest duration of the given calls"""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def run_case(number_of_particles: int, neighbours: float, dimensions: int = 2, steps: int = 3, seed: int = 0) -> dict:
+    """
+    Measures the spatial hash on particles spread uniformly, the side of the space growing with their number so every
+    particle has about the same number of neighbours
+    :param number_of_particles: The number of particles
+    :param neighbours: The expected number of particles within the radius (1) of a particle
+    :param dimensions: The number of dimensions of the space
+    :param steps: The number of swarm steps timed with and without crowding
+    :param seed: The seed of the positions
+    """
+    rng = np.random.default_rng(seed)
+    radius = 1.0
+    ball = math.pi ** (dimensions / 2) / math.gamma(dimensions / 2 + 1) * radius ** dimensions
+    side = (number_of_particles * ball / neighbours) ** (1 / dimensions)
+    positions = rng.uniform(0, side, size=(number_of_particles, dimensions))
+    moved = positions + rng.normal(0, 0.05 * radius, size=positions.shape)
+
+    index = SpatialHash(radius)
+    result = {
+        "particles": number_of_particles,
+        "dimensions": dimensions,
+        "build_seconds": seconds(lambda: SpatialHash(radius).build(positions)),
+    }
+    # the particles only moved a little, as between two steps, so the previous order is nearly sorted
+    rebuilds = []
+    for _ in range(3):
+        index.build(positions)
+        rebuilds.append(seconds(lambda: index.build(moved), repeats=1))
+    result["rebuild_seconds"] = min(rebuilds)
+    result["pairs_seconds"] = seconds(lambda: index.pairs(radius))
+    result["pairs"] = len(index.pairs(radius)[0])
+
+    if number_of_particles <= MAX_BRUTE_FORCE:
+        start = time.perf_counter()
+        brute_force = brute_force_pairs(moved, radius)
+        result["brute_force_seconds"] = time.perf_counter() - start
+        if brute_force != result["pairs"]:
+            raise AssertionError(f"The spatial hash found {result['pairs']} pairs instead of {brute_force}")
+
+    bounds = [(0, side)] * dimensions
+    for name, crowding in (("step_seconds", None), ("crowding_step_seconds", Crowding(radius, 0.1))):
+        swarm = ParticleSwarm(objective=FunctionObjective(sphere, bounds), number_of_particles=number_of_particles,
+                              search_minimum=True, seed=seed, crowding=crowding)
+        result[name] = seconds(swarm.step, steps)
+    return result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the spatial hash of the particle-particle interactions")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES, help="The numbers of particles")
+    parser.add_argument("--neighbours", type=float, default=3.0,
+                        help="The expected number of neighbours of a particle")
+    parser.add_argument("--dimensions", type=int, default=2, help="The number of dimensions of the space")
+    parser.add_argument("--steps", type=int, default=3, help="The number of swarm steps timed per case")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the positions")
+    parser.add_argument("--output", default="out/spatial_hash_benchmark.json",
+                        help="The file where the report is saved")
+    args = parser.parse_args(arguments)
+
+    results = []
+    for size in args.sizes:
+        result = run_case(size, args.neighbours, args.dimensions, args.steps, args.seed)
+        results.append(result)
+
+        baseline = f", all pairs {result['brute_force_seconds'] * 1000:.1f} ms" if "brute_force_seconds" in result \
+            else ""
+        print(f"{size} particles: build {result['build_seconds'] * 1000:.1f} ms, "
+              f"rebuild {result['rebuild_seconds'] * 1000:.1f} ms, {result['pairs']} pairs in "
+              f"{result['pairs_seconds'] * 1000:.1f} ms{baseline}, step {result['step_seconds'] * 1000:.1f} ms "
+              f"({result['crowding_step_seconds'] * 1000:.1f} ms with crowding)")
+
+    report = {"metadata": {"python": platform.python_version(), "numpy": np.__version__,
+                           "machine": platform.machine(), "neighbours": args.neighbours, "seed": args.seed},
+              "results": results}
+    make_file_dir_if_not_exist(args.output)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2, default=float)
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+class Evaluator:
+    """
+    Evaluates the objective at the positions of all the particles of a step (the evaluation phase of
+    `ParticleSwarm.step`), returning an array with the value of every position.
+    """
+    def evaluate(self, objective, positions):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class BatchEvaluator(Evaluator):
+    """Evaluates all the positions with a single vectorized call of the objective"""
+
+    def evaluate(self, objective, positions):
+        return objective.evaluate(positions)
+
+
+def _evaluate_chunk(objective, positions):
+    return objective.evaluate(positions)
+
+
+# The objective of the pool processes owned by an `ExecutorEvaluator`, sent once by `_set_objective`
+_worker = {}
+
+
+def _set_objective(objective):
+    _worker["objective"] = objective
+
+
+def _evaluate_worker_chunk(positions):
+    return _worker["objective"].evaluate(positions)
+
+
+class ExecutorEvaluator(Evaluator):
+    """
+    Splits the positions into chunks evaluated concurrently by an executor, for expensive objectives such as a
+    simulation run per particle. By default the evaluator runs its own process pool, to which the objective is sent
+    once (when the pool starts, and again only if another objective is evaluated), so only the positions are sent at
+    every step. A given `concurrent.futures` executor can be used instead: a thread pool shares the objective, while a
+    process pool receives it with every chunk (so it has to be picklable).
+    """
+    def __init__(self, executor=None, chunk_size: int = None, shutdown: bool = False, workers: int = None):
+        """
+        :param executor: The executor running the evaluations, by default a process pool owned by the evaluator
+        :param chunk_size: The number of positions evaluated by a single call of the objective, by default the number
+        of positions divided evenly between the workers
+        :param shutdown: Whether `close` shuts the given executor down (the owned pool always is)
+        :param workers: The number of processes of the owned pool, or the number of workers of the given executor
+        the positions are divided between (by default its `max_workers`, or the number of CPUs)
+        """
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.shutdown = shutdown
+        self.workers = workers or getattr(executor, "_max_workers", None) or os.cpu_count() or 1
+        self._pool = None
+        self._pool_objective = None
+
+    def _owned_pool(self, objective):
+        if self._pool is None or self._pool_objective is not objective:
+            if self._pool is not None:
+                self._pool.shutdown()
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_set_objective, initargs=(objective,))
+            self._pool_objective = objective
+        return self._pool
+
+    def evaluate(self, objective, positions):
+        if len(positions) == 0:
+            return objective.evaluate(positions)
+
+        chunk_size = self.chunk_size or math.ceil(len(positions) / self.workers)
+        chunks = [positions[start:start + chunk_size] for start in range(0, len(positions), chunk_size)]
+        if self.executor is None:
+            results = self._owned_pool(objective).map(_evaluate_worker_chunk, chunks)
+        else:
+            results = self.executor.map(_evaluate_chunk, [objective] * len(chunks), chunks)
+        return np.concatenate([np.asarray(result, dtype=float).reshape(-1) for result in results])
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_objective = None
+        if self.shutdown and self.executor is not None:
+            self.executor.shutdown()
+
+
+class CachedEvaluator(Evaluator):
+    """
+    Remembers the value of every visited position, keyed by the position discretized to a given resolution, so the
+    positions visited again (or several times in the same step) are only evaluated once by the wrapped evaluator.
+    Positions falling in the same cell of the resolution share the value of the first one evaluated. The values are
+    those of a single objective, the cache being cleared when it is given another one.
+    """
+    def __init__(self, evaluator: Evaluator = None, resolution=None, max_size: int = None):
+        """
+        :param evaluator: The evaluator of the positions missing from the cache (a `BatchEvaluator` by default)
+        :param resolution: The size of the cells positions are discretized to (a number or one per dimension). If not
+        set, the positions are used as they are, which is only allowed for discrete objectives (grids)
+        :param max_size: If set, the cache is cleared when it holds more values
+        """
+        self.evaluator = evaluator or BatchEvaluator()
+        self.resolution = resolution
+        self.max_size = max_size
+        self.values = {}
+        self.objective = None
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, positions):
+        """Returns the discretized positions, as rows of an integer array"""
+        if self.resolution is None:
+            return np.asarray(positions).astype(np.int64)
+        return np.floor(np.asarray(positions) / self.resolution).astype(np.int64)
+
+    def evaluate(self, objective, positions):
+        if self.resolution is None and not objective.discrete:
+            raise ValueError(f"A resolution is needed to cache the values of the continuous {type(objective).__name__}")
+        if objective is not self.objective:
+            self.values.clear()
+            self.objective = objective
+
+        keys = np.ascontiguousarray(self.keys(positions))
+        # the rows as bytes, so they can be hashed
+        row_keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel().tolist()
+
+        values = np.empty(len(positions))
+        missing = {}
+        for index, key in enumerate(row_keys):
+            value = self.values.get(key)
+            if value is not None:
+                values[index] = value
+            else:
+                missing.setdefault(key, []).append(index)
+
+        self.hits += len(positions) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            evaluated = self.evaluator.evaluate(objective, positions[first])
+
+            if self.max_size is not None and len(self.values) + len(missing) > self.max_size:
+                self.values.clear()
+            for (key, indices), value in zip(missing.items(), evaluated.tolist()):
+                self.values[key] = value
+                values[indices] = value
+
+        return values
+
+    def close(self):
+        self.evaluator.close()
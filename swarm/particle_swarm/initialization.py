@@ -1,4 +1,7 @@
 import random
+
+import numpy as np
+
 from swarm.particle_swarm.particle import Particle
 
 
@@ -8,6 +11,24 @@ class ParticleInitialization:
                    number_of_particles: int) -> set[Particle]:
         raise NotImplementedError
 
+    def initialize_arrays(self, objective, number_of_particles: int, rng: np.random.Generator = None):
+        """
+        Initializes the particles as a structure of arrays, as used by `ParticleSwarm`
+        :param objective: The objective the particles search (see `swarm.particle_swarm.objective`)
+        :param number_of_particles: The number of particles
+        :param rng: The random generator to draw from (strategies which do not override this method use `random`)
+        :return: The positions (an array of shape (number_of_particles, dimensions), of integers for discrete
+        objectives) and the velocities (a float array of the same shape)
+        """
+        grid = getattr(objective, "grid", None)
+        if grid is None:
+            raise NotImplementedError(f"{type(self).__name__} can only initialize particles on a grid")
+
+        particles = list(self.initialize(grid, number_of_particles))
+        positions = np.array([p.position for p in particles], dtype=np.int64).reshape(-1, 2)
+        velocities = np.array([p.velocity for p in particles], dtype=float).reshape(-1, 2)
+        return positions, velocities
+
 
 def compute_random_velocity(x_lo: int, y_lo: int, x_up: int, y_up: int):
     vx = abs(x_up - x_lo)
@@ -18,6 +39,17 @@ def compute_random_velocity(x_lo: int, y_lo: int, x_up: int, y_up: int):
     return [velocity_x, velocity_y]
 
 
+def compute_random_velocities(objective, number_of_particles: int, rng: np.random.Generator):
+    """Vectorized `compute_random_velocity`: velocities in [-extent, extent] on every dimension, where the extent is
+    the size of the search space along it (integer velocities for discrete objectives)"""
+    extent = objective.upper - objective.lower
+    size = (number_of_particles, objective.dimensions)
+    if objective.discrete:
+        extent = extent.astype(np.int64)
+        return rng.integers(-extent, extent + 1, size=size).astype(float)
+    return rng.uniform(-extent, extent, size=size)
+
+
 class RandomParticleInitialization(ParticleInitialization):
 
     def initialize(self,
@@ -44,6 +76,16 @@ class RandomParticleInitialization(ParticleInitialization):
 
         return particles
 
+    def initialize_arrays(self, objective, number_of_particles: int, rng: np.random.Generator = None):
+        rng = rng or np.random.default_rng()
+        size = (number_of_particles, objective.dimensions)
+
+        if objective.discrete:
+            positions = rng.integers(objective.lower.astype(np.int64), objective.upper.astype(np.int64) + 1, size=size)
+        else:
+            positions = rng.uniform(objective.lower, objective.upper, size=size)
+        return positions, compute_random_velocities(objective, number_of_particles, rng)
+
 
 class UniformParticleInitialization(ParticleInitialization):
 
@@ -71,8 +113,10 @@ class UniformParticleInitialization(ParticleInitialization):
 
         return particles
 
+    def initialize_arrays(self, objective, number_of_particles: int, rng: np.random.Generator = None):
+        rng = rng or np.random.default_rng()
 
-
-
-
-
+        positions = rng.uniform(objective.lower, objective.upper, size=(number_of_particles, objective.dimensions))
+        if objective.discrete:
+            positions = positions.astype(np.int64)
+        return positions, compute_random_velocities(objective, number_of_particles, rng)
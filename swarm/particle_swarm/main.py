@@ -11,7 +11,7 @@ swarm = ps.ParticleSwarm(200, 200,
                          search_minimum=False,
                          initialization_strategy=UniformParticleInitialization(),
                          simulation_terminator=st.IterationTerminator(200),
-                         map_strategy=PerlinNoiseMapStrategy(14, 5),
+                         map_strategy=PerlinNoiseMapStrategy(14, 5, cache_dir='out/terrain'),
                          random_local=1,
                          random_global=1,
                          velocity_max_magnitude = 5.0)
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class Objective:
+    """
+    The function optimized by the swarm. It evaluates all the particles at once: `evaluate` takes an array of
+    positions of shape (number_of_particles, dimensions) and returns their values as an array of shape
+    (number_of_particles,).
+    """
+    # If set to `True`, the positions are integers (e.g. the indices of a grid)
+    discrete = False
+
+    def __init__(self, bounds):
+        """
+        :param bounds: The (lower, upper) bounds of every dimension, as a sequence of pairs
+        """
+        bounds = np.asarray(bounds, dtype=float).reshape(-1, 2)
+        if (bounds[:, 0] > bounds[:, 1]).any():
+            raise ValueError("The lower bounds must not be greater than the upper bounds")
+
+        self.lower = bounds[:, 0]
+        self.upper = bounds[:, 1]
+
+    @property
+    def dimensions(self) -> int:
+        return len(self.lower)
+
+    def evaluate(self, positions):
+        raise NotImplementedError
+
+
+class GridObjective(Objective):
+    """The values of a precomputed grid (such as a `MapStrategy` map), indexed by integer positions"""
+    discrete = True
+
+    def __init__(self, grid):
+        self.grid = np.asarray(grid, dtype=float)
+        super().__init__([(0, size - 1) for size in self.grid.shape])
+
+    def evaluate(self, positions):
+        return self.grid[tuple(np.asarray(positions).T)]
+
+
+class FunctionObjective(Objective):
+    """A vectorized function of continuous positions, which is never materialized as a grid"""
+
+    def __init__(self, function, bounds):
+        """
+        :param function: A callable taking an array of positions of shape (number_of_particles, dimensions) and
+        returning the array of their values
+        :param bounds: The (lower, upper) bounds of every dimension, as a sequence of pairs
+        """
+        super().__init__(bounds)
+        self.function = function
+
+    def evaluate(self, positions):
+        return np.asarray(self.function(positions), dtype=float)
+
+
+def sphere(positions):
+    """Sum of squares, minimum 0 at the origin"""
+    return np.sum(positions ** 2, axis=-1)
+
+
+def rastrigin(positions):
+    """Highly multimodal function, minimum 0 at the origin (usually searched in [-5.12, 5.12] on every dimension)"""
+    return 10 * positions.shape[-1] + np.sum(positions ** 2 - 10 * np.cos(2 * np.pi * positions), axis=-1)
+
+
+def rosenbrock(positions):
+    """Function with a narrow curved valley, minimum 0 at (1, ..., 1) (usually searched in [-5, 10])"""
+    return np.sum(100 * (positions[..., 1:] - positions[..., :-1] ** 2) ** 2 + (1 - positions[..., :-1]) ** 2, axis=-1)
+
+
+def ackley(positions):
+    """Nearly flat function with a deep hole, minimum 0 at the origin (usually searched in [-32.768, 32.768])"""
+    dimensions = positions.shape[-1]
+    return (-20 * np.exp(-0.2 * np.sqrt(np.sum(positions ** 2, axis=-1) / dimensions))
+            - np.exp(np.sum(np.cos(2 * np.pi * positions), axis=-1) / dimensions) + 20 + np.e)
@@ -1,16 +1,40 @@
-from random import random, uniform
+import time
 
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.animation import FuncAnimation
 
-from swarm.particle_swarm.dir_util import make_file_dir_if_not_exist
+from swarm.particle_swarm.evaluation import Evaluator, BatchEvaluator
 from swarm.particle_swarm.initialization import ParticleInitialization, RandomParticleInitialization
+from swarm.particle_swarm.objective import Objective, GridObjective
+from swarm.particle_swarm.particle import Particle
 from swarm.particle_swarm.simulation_terminator import SimulationTerminator, IterationTerminator
+from swarm.particle_swarm.spatial_hash import Crowding
 from swarm.particle_swarm.strategy import MapStrategy, PerlinNoiseMapStrategy
+from swarm.particle_swarm.topology import Topology, GlobalTopology
+from swarm.particle_swarm.trajectory import TrajectorySink, MemorySink
+
+
+class SwarmResult:
+    """The outcome of `ParticleSwarm.solve`"""
+    def __init__(self, best_position, best_value, history):
+        """
+        :param best_position: The best position found
+        :param best_value: The value of the objective at the best position
+        :param history: The best value after every step (history[0] being the one of the initial positions)
+        """
+        self.best_position = best_position
+        self.best_value = best_value
+        self.history = history
+
+    @property
+    def steps(self) -> int:
+        return len(self.history) - 1
+
+    def __repr__(self):
+        return f"SwarmResult(best_position={self.best_position}, best_value={self.best_value}, steps={self.steps})"
+
 
 class ParticleSwarm:
-    def __init__(self, grid_width,  grid_height,
+    def __init__(self, grid_width=None,  grid_height=None,
                 map_strategy: MapStrategy=PerlinNoiseMapStrategy(10, 5),
                 current_velocity_weight: float = 0.6,
                 best_local_weight: float = 0.4,
@@ -22,9 +46,16 @@ class ParticleSwarm:
                 particle_size: int = 5,
                 velocity_max_magnitude=None,
                 random_local: float = None,
-                random_global: float = None):
+                random_global: float = None,
+                seed=None,
+                objective: Objective = None,
+                evaluator: Evaluator = None,
+                topology: Topology = None,
+                crowding: Crowding = None,
+                asynchronous: bool = False):
         """
-        Initializes a number of particles for the given grid of the given size
+        Initializes a number of particles for the given grid of the given size. The swarm is headless: `solve` runs it
+        without ever importing matplotlib, which is only loaded by `run` to animate the recorded positions.
         :param grid_width: The width of the grid
         :param grid_height: The height of the grid
         :param map_strategy: The strategy used to initialize the grid's values (if none passed, it wil default to PerlinNoise strategy)
@@ -43,6 +74,21 @@ class ParticleSwarm:
         then it will be chosen randomly for each velocity update.
         :param random_global: If set to a float value, it will influence the result the best known global position has on a particle's velocity. If not set (`None`),
         then it will be chosen randomly for each velocity update.
+        :param seed: The seed (or `np.random.Generator`) of the random draws of the particles, so runs can be repeated
+        :param objective: The function to optimize (see `swarm.particle_swarm.objective`), in any number of dimensions.
+        If not set, it is the grid of the given size generated by the map strategy (a `GridObjective`)
+        :param evaluator: How the positions of all the particles are evaluated at every step (see
+        `swarm.particle_swarm.evaluation`), by default with a single vectorized call of the objective
+        :param topology: Which particles inform each other (see `swarm.particle_swarm.topology`): the
+        `best_global_weight` attracts every particle to the best position known in its neighbourhood. By default, the
+        whole swarm
+        :param crowding: If set, a repulsion between the particles closer than its radius is added to their velocities
+        (see `swarm.particle_swarm.spatial_hash.Crowding`), to keep the swarm diverse
+        :param asynchronous: By default, the global best is updated once all the particles moved (synchronous PSO), a
+        deliberate change from the original particle by particle loop which vectorizes a step. If true, every particle
+        is attracted by the global best updated by the particles before it in the same step, as in that loop (the
+        trajectories are the same for fixed random weights). This needs the global topology, and costs a batch of
+        evaluations per improvement of the global best within a step
         """
 
         self.velocity_max_magnitude = velocity_max_magnitude
@@ -54,169 +100,271 @@ class ParticleSwarm:
         self.rp = random_local
         self.rg = random_global
 
-        self.grid = self.strategy.initialize_map(self.width, self.height)
+        if objective is None:
+            objective = GridObjective(self.strategy.initialize_map(self.width, self.height))
+        self.objective = objective
+        self.evaluator = evaluator or BatchEvaluator()
+        self.topology = topology or GlobalTopology()
+        self.crowding = crowding
+        if asynchronous and not isinstance(self.topology, GlobalTopology):
+            raise ValueError("The asynchronous update of the global best needs the global topology")
+        self.asynchronous = asynchronous
+        # Only grid objectives have a map which can be rendered
+        self.grid = getattr(objective, "grid", None)
 
         self.local_weight = best_local_weight
         self.global_weight = best_global_weight
         self.velocity_weight = current_velocity_weight
         self.number_of_particles = number_of_particles
 
-        self.particles = initialization_strategy.initialize(self.grid, self.number_of_particles)
-
-        # get the highest(or lowest best value from the particles
+        self.rng = np.random.default_rng(seed)
+        self.search_minimum = search_minimum
 
-        if search_minimum:
-            self.best = min(self.particles, key=lambda p: self.f(p.local), default=None).position
-        else:
-            self.best = max(self.particles, key=lambda p: self.f(p.local), default=None).position
+        # The swarm is kept as a structure of arrays, row i holding particle i, so a step is a few batched operations
+        self.positions, self.velocities = initialization_strategy.initialize_arrays(self.objective,
+                                                                                    self.number_of_particles, self.rng)
+        self.locals = self.positions.copy()
+        self.local_values = self.evaluate(self.locals)
+        # The values of the current positions, as last evaluated by a step
+        self.values = self.local_values.copy()
 
-        self.search_minimum = search_minimum
+        # get the highest (or lowest) best value from the particles
+        best = self._best_index(self.local_values)
+        self.best = self.locals[best].copy()
+        self.best_value = self.local_values[best]
 
         self.terminator = simulation_terminator
+        # The state the terminators decide from: the number of steps run, the step the global best last improved at
+        # and when the run started
+        self.iteration = 0
+        self.last_improvement = 0
+        self.started_at = time.perf_counter()
+
+        self.particle_size = particle_size
+
+    @property
+    def particles(self) -> list[Particle]:
+        """A snapshot of the swarm as `Particle` objects (changing them does not affect the swarm), with the values of
+        their positions evaluated by the last step"""
+        particles = []
+        for position, velocity, local, value in zip(self.positions.tolist(), self.velocities.tolist(),
+                                                    self.locals.tolist(), self.values.tolist()):
+            particle = Particle(position[0], position[1], value, velocity)
+            # the particles can have more than 2 dimensions
+            particle.position = position
+            particle.local = local
+            particles.append(particle)
+        return particles
 
-        self.fig, self.ax = plt.subplots()
-        self.mat = self.ax.matshow(self.grid)
-
+    def f(self, pos):
+        return self.objective.evaluate(np.asarray(pos)[None])[0]
 
-        px = [p.position[0] for p in self.particles]
-        py = [p.position[1] for p in self.particles]
-        self.scatter = plt.scatter(px, py, c='red', s=particle_size)
+    def evaluate(self, positions):
+        """Returns the values of the objective at the given positions, an array of shape (n, dimensions)"""
+        return self.evaluator.evaluate(self.objective, positions)
 
-        plt.colorbar(self.mat, ax=self.ax, label='Noise Value')
+    def _best_index(self, values):
+        return np.argmin(values) if self.search_minimum else np.argmax(values)
 
-        self.text = self.ax.text(2, 0, "", bbox={'facecolor': 'white', 'alpha': 0.5, 'pad': 2})
+    def _improves(self, values, reference):
+        return values < reference if self.search_minimum else values > reference
 
-    def f(self, pos):
-        return self.grid[pos[0]][pos[1]]
+    def _random_weights(self, fixed):
+        if fixed is not None:
+            return fixed
+        return self.rng.random(self.positions.shape)
 
     def step(self):
+        """Moves the particles, then evaluates all their new positions at once and updates the bests"""
+        if self.asynchronous:
+            self._step_asynchronously()
+            return
+        self.update_positions()
+        self.iteration += 1
+        self.update_bests(self.evaluate(self.positions))
+
+    def update_positions(self):
+        """The update phase of a step: computes the new velocities and positions of the particles"""
+        rp = self._random_weights(self.rp)
+        rg = self._random_weights(self.rg)
+        social = self.topology.neighbourhood_bests(self)
+        crowding = self.crowding.velocities(self) if self.crowding is not None else None
+        self.positions, self.velocities = self._moved(slice(None), social, rp, rg, crowding)
+
+    def _moved(self, particles: slice, social, rp, rg, crowding=None, jitter=None):
+        """
+        Returns the new positions and velocities of some particles, without changing the swarm
+        :param particles: The slice of the particles to move
+        :param social: The position every particle is attracted to by the `best_global_weight`, either one for all of
+        them or one row per particle of the swarm
+        :param rp: The random weights of the personal bests, a float or one row per particle of the swarm
+        :param rg: The random weights of the social term, a float or one row per particle of the swarm
+        :param crowding: If set, the crowding term of every particle of the swarm
+        :param jitter: If set, the random velocity added to every coordinate of the swarm bouncing on a bound, by
+        default drawn for the bouncing ones only
+        """
+        def rows(array):
+            return array[particles] if np.ndim(array) == 2 else array
+
         w = self.velocity_weight
         phi_p = self.local_weight
         phi_g = self.global_weight
-        for p in self.particles:
-
-            # d=0: x, d=1: y
-            for d in range(2):
-
-                if self.rp is not None:
-                    rp = self.rp
-                else:
-                    rp = random()
-
-                if self.rg is not None:
-                    rg = self.rg
-                else: rg = random()
-
-                p.velocity[d] = w * p.velocity[d] + phi_p * rp * (p.local[d] - p.position[d]) + phi_g * rg * (self.best[d] - p.position[d])
-
-
-            # Normalize the velocity vector if possible
-            if self.velocity_max_magnitude is not None:
-
-                # If we have a vector v = (a, b), then norm(v) = sqrt(a^2 + b^2)
-                # If we want to have another vector w = s * v, where s is a scalar and norm(w) = t, then
-                # we have norm(w) = norm(s * v) = s * norm(v) = t, from which we can say that
-                # s = t/norm(v)
-                # so the vector we are looking for is w = t / norm(v) * v, where t is our desired magnitude and v is our velocity vector
-
-                vel = np.array(p.velocity, dtype = float)
-                norm_vec = np.linalg.norm(vel)
-                # this only happens if we exceed the maximum magnitude
-                if norm_vec > self.velocity_max_magnitude:
-                    vel = (vel * self.velocity_max_magnitude) / norm_vec # multiplication first to not truncate results from the division
-
-                p.velocity[0] = float(vel[0])
-                p.velocity[1] = float(vel[1])
-
-            # Update positions but reflect the velocity in case a particle gets stuck in a corner (like a bounce effect, but with dampening factor)
-            damping_factor = 0.7
 
-            for d, max_val in zip(range(2), [self.width, self.height]):
-                p.position[d] += int(p.velocity[d])
-
-                # Handling edges (bounce back)
-                if p.position[d] < 0:
-                    p.position[d] = 0
-                    p.velocity[d] = -damping_factor * p.velocity[d] + uniform(-0.2, 0.2) # add a bit of randomness to encourage exploration
-
-                elif p.position[d] >= max_val:
-                    p.position[d] = max_val - 1
-                    p.velocity[d] = -damping_factor * p.velocity[d] + uniform(-0.2, 0.2)
-
-
-            if self.search_minimum:
-                if self.f(p.position) < self.f(p.local):
-                    p.local = p.position.copy()
-                    if self.f(p.local) < self.f(self.best):
-                        self.best = p.local.copy()
-            else:
-                if self.f(p.position) > self.f(p.local):
-                    p.local = p.position.copy()
-                    if self.f(p.local) > self.f(self.best):
-                        self.best = p.local.copy()
-
-    def record(self, verbose):
+        positions = self.positions[particles]
+        velocities = (w * self.velocities[particles] + phi_p * rows(rp) * (self.locals[particles] - positions)
+                      + phi_g * rows(rg) * (rows(social) - positions))
+        if crowding is not None:
+            velocities += crowding[particles]
+
+        # Normalize the velocity vectors exceeding the maximum magnitude to it: w = t / norm(v) * v, where t is our
+        # desired magnitude and v is our velocity vector
+        if self.velocity_max_magnitude is not None:
+            norms = np.linalg.norm(velocities, axis=1, keepdims=True)
+            exceeding = norms[:, 0] > self.velocity_max_magnitude
+            velocities[exceeding] *= self.velocity_max_magnitude / norms[exceeding]
+
+        # Update positions but reflect the velocity in case a particle gets stuck in a corner (like a bounce effect,
+        # but with dampening factor)
+        damping_factor = 0.7
+
+        if self.objective.discrete:
+            positions = positions + np.trunc(velocities).astype(np.int64)
+        else:
+            positions = positions + velocities
+
+        lower, upper = self.objective.lower, self.objective.upper
+        outside = (positions < lower) | (positions > upper)
+        positions = np.clip(positions, lower, upper).astype(positions.dtype)
+        # add a bit of randomness to encourage exploration
+        if jitter is None:
+            jitter = self.rng.uniform(-0.2, 0.2, size=int(outside.sum()))
+        else:
+            jitter = jitter[particles][outside]
+        velocities[outside] = -damping_factor * velocities[outside] + jitter
+        return positions, velocities
 
-        frames = []
-        px = [p.position[0] for p in self.particles]
-        py = [p.position[1] for p in self.particles]
-        frames.append((px, py))
+    def _step_asynchronously(self):
+        """
+        A step where, as in the original particle by particle loop, every particle is attracted by the global best
+        updated by the particles before it. The particles are moved and evaluated in batches: all the remaining ones
+        towards the current global best, of which the ones up to the first beating it are kept, the others being moved
+        again towards the new global best.
+        """
+        rp = self._random_weights(self.rp)
+        rg = self._random_weights(self.rg)
+        crowding = self.crowding.velocities(self) if self.crowding is not None else None
+        jitter = self.rng.uniform(-0.2, 0.2, size=self.positions.shape)
+        self.iteration += 1
+
+        positions, velocities, current_values = self.positions.copy(), self.velocities.copy(), self.values.copy()
+        start = 0
+        while start < len(positions):
+            moved_positions, moved_velocities = self._moved(slice(start, None), self.best, rp, rg, crowding, jitter)
+            values = self.evaluate(moved_positions)
+
+            better = np.flatnonzero(self._improves(values, self.best_value))
+            end = start + better[0] + 1 if len(better) else len(positions)
+            kept = slice(start, end)
+            positions[kept] = moved_positions[:end - start]
+            velocities[kept] = moved_velocities[:end - start]
+            current_values[kept] = values[:end - start]
+
+            # only the personal bests of the kept particles are updated, the others are moved again from the same state
+            values = values[:end - start]
+            improved = start + np.flatnonzero(self._improves(values, self.local_values[kept]))
+            self.locals[improved] = positions[improved]
+            self.local_values[improved] = values[improved - start]
+            if len(better):
+                self.best = positions[end - 1].copy()
+                self.best_value = values[-1]
+                self.last_improvement = self.iteration
+            start = end
+
+        self.positions, self.velocities, self.values = positions, velocities, current_values
+
+    def update_bests(self, values):
+        """Updates the personal bests where the new positions are better, then the global best if one of them beats it
+        (once per step, see `asynchronous`)
+        :param values: The values of the current positions of the particles"""
+        self.values = values
+        improved = self._improves(values, self.local_values)
+        self.locals[improved] = self.positions[improved]
+        self.local_values[improved] = values[improved]
+
+        best = self._best_index(self.local_values)
+        if self._improves(self.local_values[best], self.best_value):
+            self.best = self.locals[best].copy()
+            self.best_value = self.local_values[best]
+            self.last_improvement = self.iteration
+
+    def solve(self, verbose=False, sink: TrajectorySink = None) -> SwarmResult:
+        """
+        Steps the swarm until the terminator stops it
+        :param verbose: Whether to show print statements regarding the simulation for each step
+        :param sink: If set, the positions of the particles are streamed to it after every step (see
+        `swarm.particle_swarm.trajectory`)
+        :return: The best position, its value and the best value after every step
+        """
+        self.started_at = time.perf_counter()
+        history = [self.best_value]
+        if sink is not None:
+            sink.observe(0, self.positions)
 
         if verbose:
             print(f"-- Step 0 --")
             print(f"Best Position: {self.best}")
-            print(f"Best Value: {self.f(self.best)}")
+            print(f"Best Value: {self.best_value}")
             print("-----------")
 
 
         step = 1
         while not self.terminator.shall_terminate(self):
             self.step()
-            px = [p.position[0] for p in self.particles]
-            py = [p.position[1] for p in self.particles]
-            frames.append((px, py))
-            step += 1
+            history.append(self.best_value)
+            if sink is not None:
+                sink.observe(step, self.positions)
 
             if verbose:
                 print(f"-- Step {step} --")
                 print(f"Best Position: {self.best}")
-                print(f"Best Value: {self.f(self.best)}")
+                print(f"Best Value: {self.best_value}")
                 print("-----------")
 
-        return frames
+            step += 1
 
+        if sink is not None:
+            sink.flush()
+        return SwarmResult(self.best.copy(), self.best_value, np.array(history))
 
-    def run(self, frame_interval=50, save_path: str=None, verbose=False):
+    def record(self, verbose=False, sink: TrajectorySink = None) -> TrajectorySink:
         """
-        Runs the simulation
+        Steps the swarm until the terminator stops it, streaming the positions of the particles to a trajectory sink
+        :param verbose: Whether to show print statements regarding the simulation for each step
+        :param sink: Where the positions are recorded (see `swarm.particle_swarm.trajectory`), by default all the steps
+        are kept in memory (a `ChunkedSink` keeps long runs on disk, a `RingBufferSink` only the last steps)
+        :return: The sink (flushed)
+        """
+        if sink is None:
+            sink = MemorySink()
+        self.solve(verbose, sink)
+        return sink
+
+
+    def run(self, frame_interval=50, save_path: str=None, verbose=False, sink: TrajectorySink = None):
+        """
+        Runs the simulation and animates it (importing matplotlib)
         :param frame_interval: The interval between each frame
         :param save_path: Where to save the animation (if not set, the animation will just be played)
         :param verbose: Whether to show print statements regarding the simulation for each step
+        :param sink: Where the positions are recorded before being animated (see `record`)
         :return: A tuple composed of the simulation final best particle position and its value
         """
-        frames = self.record(verbose)
-
-        def update(frame):
-            px, py = frames[frame]
-            offsets = np.stack([px, py]).T
-            self.scatter.set_offsets(offsets)
-            self.text.set_text(f"Step {frame}")
-
-            return self.mat, self.scatter, self.text
-
-
-        self.anim = FuncAnimation(
-            self.fig, func=update, frames=len(frames), interval=frame_interval
-        )
-
-        if save_path:
-            make_file_dir_if_not_exist(save_path)
-            self.anim.save(save_path)
-        else:
-            plt.show()
-
-        return self.anim, (self.best, self.f(self.best))
-
+        if self.grid is None or self.grid.ndim != 2:
+            raise NotImplementedError("Only the swarms searching a 2D grid can be animated")
 
+        from swarm.particle_swarm.rendering import animate_trajectory
 
+        frames = self.record(verbose, sink)
+        self.anim = animate_trajectory(self.grid, frames, frame_interval, save_path, self.particle_size)
 
+        return self.anim, (self.best, self.best_value)
@@ -0,0 +1,46 @@
+from matplotlib import pyplot as plt
+from matplotlib.animation import FuncAnimation
+
+from swarm.particle_swarm.dir_util import make_file_dir_if_not_exist
+
+
+def animate_trajectory(grid, trajectory, frame_interval=50, save_path: str = None, particle_size: int = 5):
+    """
+    Animates recorded particle positions over the map they searched. This module imports matplotlib, so it is only
+    imported when rendering, the swarm itself being headless.
+    :param grid: The 2D map searched by the particles
+    :param trajectory: The recorded positions (a `TrajectorySink`), read one frame at a time
+    :param frame_interval: The interval between each frame
+    :param save_path: Where to save the animation (if not set, the animation will just be played)
+    :param particle_size: The size of the particles when rendered
+    :return: The animation
+    """
+    fig, ax = plt.subplots()
+    mat = ax.matshow(grid)
+
+    first = trajectory[0]
+    scatter = plt.scatter(first[:, 0], first[:, 1], c='red', s=particle_size)
+
+    plt.colorbar(mat, ax=ax, label='Noise Value')
+
+    text = ax.text(2, 0, "", bbox={'facecolor': 'white', 'alpha': 0.5, 'pad': 2})
+    steps = trajectory.steps
+
+    def update(frame):
+        scatter.set_offsets(trajectory[frame][:, :2])
+        text.set_text(f"Step {steps[frame]}")
+
+        return mat, scatter, text
+
+
+    anim = FuncAnimation(
+        fig, func=update, frames=len(trajectory), interval=frame_interval
+    )
+
+    if save_path:
+        make_file_dir_if_not_exist(save_path)
+        anim.save(save_path)
+    else:
+        plt.show()
+
+    return anim
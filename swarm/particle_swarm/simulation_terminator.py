@@ -1,15 +1,93 @@
+import time
+
+import numpy as np
+
+
 class SimulationTerminator:
+    """
+    Decides whether a simulation stops, from the state of the swarm only (its iteration, bests and arrays), so the
+    same terminator can be reused across runs. Terminators can be combined with `|` (any) and `&` (all).
+    """
     def shall_terminate(self, simulation):
         raise NotImplementedError
 
+    def __or__(self, other):
+        return AnyTerminator(self, other)
+
+    def __and__(self, other):
+        return AllTerminator(self, other)
+
 
 class IterationTerminator(SimulationTerminator):
+    """Stops after `max_iterations - 1` steps (the initial positions counting as the first iteration)"""
     def __init__(self, max_iterations):
-        self.iteration = 0
         self.max_iterations = max_iterations
 
     def shall_terminate(self, simulation):
-        self.iteration += 1
-        if self.iteration == self.max_iterations:
-            return True
-        return False
\ No newline at end of file
+        return simulation.iteration + 1 >= self.max_iterations
+
+
+class StagnationTerminator(SimulationTerminator):
+    """Stops when the global best did not improve for the given number of steps"""
+    def __init__(self, steps: int):
+        self.steps = steps
+
+    def shall_terminate(self, simulation):
+        return simulation.iteration - simulation.last_improvement >= self.steps
+
+
+class DiameterTerminator(SimulationTerminator):
+    """Stops when the swarm has collapsed: the diagonal of the bounding box of the particles is under the threshold"""
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def shall_terminate(self, simulation):
+        return np.linalg.norm(np.ptp(simulation.positions, axis=0)) < self.threshold
+
+
+class VelocityVarianceTerminator(SimulationTerminator):
+    """Stops when the particles barely move relative to each other: the total variance of the velocities (summed over
+    the dimensions) is under the threshold"""
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def shall_terminate(self, simulation):
+        return simulation.velocities.var(axis=0).sum() < self.threshold
+
+
+class TargetValueTerminator(SimulationTerminator):
+    """Stops when the global best reaches the target value (from below when maximizing, from above when minimizing)"""
+    def __init__(self, target: float):
+        self.target = target
+
+    def shall_terminate(self, simulation):
+        if simulation.search_minimum:
+            return simulation.best_value <= self.target
+        return simulation.best_value >= self.target
+
+
+class TimeBudgetTerminator(SimulationTerminator):
+    """Stops once the simulation has been running for the given number of seconds (wall-clock)"""
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def shall_terminate(self, simulation):
+        return time.perf_counter() - simulation.started_at >= self.seconds
+
+
+class AnyTerminator(SimulationTerminator):
+    """Stops as soon as one of the terminators does"""
+    def __init__(self, *terminators: SimulationTerminator):
+        self.terminators = terminators
+
+    def shall_terminate(self, simulation):
+        return any(terminator.shall_terminate(simulation) for terminator in self.terminators)
+
+
+class AllTerminator(SimulationTerminator):
+    """Stops when all the terminators do"""
+    def __init__(self, *terminators: SimulationTerminator):
+        self.terminators = terminators
+
+    def shall_terminate(self, simulation):
+        return all(terminator.shall_terminate(simulation) for terminator in self.terminators)
@@ -0,0 +1,330 @@
+import itertools
+
+import numpy as np
+
+
+def _expand_ranges(starts, counts):
+    """Returns the owner (index in `starts`) and the value of every element of the ranges [start, start + count)"""
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(starts, counts) + offsets
+
+
+def _expand_cell_pairs(starts, counts, other_starts, other_counts):
+    """Returns every (slot, other slot) couple of the ranges [start, start + count) x [other start, other start +
+    other count), for all the given pairs of ranges"""
+    sizes = counts * other_counts
+    pairs, offsets = _expand_ranges(np.zeros(len(sizes), dtype=np.int64), sizes)
+    return starts[pairs] + offsets // other_counts[pairs], other_starts[pairs] + offsets % other_counts[pairs]
+
+
+def _batches(sizes, budget: int):
+    """Splits indices into batches, by increasing size, such that every batch padded to its largest size holds about
+    `budget` elements (a single index being larger than the budget makes its own batch)"""
+    order = np.argsort(sizes, kind='stable')
+    sizes = sizes[order]
+    start = 0
+    while start < len(order):
+        # with the sizes sorted, a batch [start, end) is padded to sizes[end - 1]
+        fits = np.arange(1, len(order) - start + 1) * sizes[start:] <= budget
+        end = start + max(1, int(fits.sum()))
+        yield np.sort(order[start:end])
+        start = end
+
+
+class SpatialHash:
+    """
+    Uniform grid over particle positions, for fixed-radius neighbour queries in O(N) expected time (for a bounded
+    number of particles per cell). The particles are sorted by the key of their cell, so each cell is a contiguous
+    range of the order. Rebuilding keeps the previous order, which is nearly sorted already when the particles only
+    moved a little, so the (stable) sort of the next step is cheap.
+    The neighbourhoods of a cell are its 3 ** dimensions adjacent cells, so in many dimensions it is built on a few of
+    the coordinates, the distances being measured on all of them (see the `positions` of `pairs` and `nearest`).
+    """
+    def __init__(self, cell_size: float):
+        """
+        :param cell_size: The side of the cells, at least the largest radius queried
+        """
+        self.cell_size = cell_size
+        self.positions = None
+        self.order = None
+
+    def build(self, positions):
+        """Indexes the given positions (an array of shape (number_of_particles, dimensions))"""
+        self.positions = np.asarray(positions, dtype=float)
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+
+        # cells are numbered in mixed radix, with a margin of one cell on every side for the adjacent cells
+        self.origin = cells.min(axis=0, initial=0) - 1
+        extents = cells.max(axis=0, initial=0) - self.origin + 2
+        multipliers = [1]
+        for extent in extents[:-1]:
+            multipliers.append(multipliers[-1] * int(extent))
+        if multipliers[-1] * int(extents[-1]) >= 2 ** 62:
+            raise ValueError("Too many cells to number, the cell size is too small for the spread of the particles")
+        self.multipliers = np.array(multipliers, dtype=np.int64)
+        self.extents = extents
+        self.cells = cells - self.origin
+        self.keys = self.cells @ self.multipliers
+
+        if self.order is None or len(self.order) != len(self.keys):
+            self.order = np.argsort(self.keys, kind='stable')
+        else:
+            self.order = self.order[np.argsort(self.keys[self.order], kind='stable')]
+
+        # the keys are sorted already, so the cells start where the key changes
+        sorted_keys = self.keys[self.order]
+        self.cell_starts = np.flatnonzero(np.diff(sorted_keys, prepend=sorted_keys[:1] - 1))
+        self.cell_keys = sorted_keys[self.cell_starts]
+        self.cell_counts = np.diff(self.cell_starts, append=len(sorted_keys))
+        self._adjacent = None
+        return self
+
+    def _find_cells(self, keys):
+        """Returns the index of the cells with the given keys, and whether they hold particles at all"""
+        index = np.searchsorted(self.cell_keys, keys)
+        index = np.minimum(index, len(self.cell_keys) - 1)
+        return index, self.cell_keys[index] == keys
+
+    def _cell_ranges(self, keys):
+        """Returns the (start, count) of the cells with the given keys in the order (count 0 for empty cells)"""
+        index, found = self._find_cells(keys)
+        return self.cell_starts[index], np.where(found, self.cell_counts[index], 0)
+
+    def _offsets(self):
+        dimensions = len(self.multipliers)
+        return np.array(list(itertools.product((-1, 0, 1), repeat=dimensions)), dtype=np.int64) @ self.multipliers
+
+    def _adjacent_cells(self):
+        """Returns the (offset, starts, counts) ranges of the adjacent cells of every cell, for the offsets visited by
+        `pairs`: each cell with itself and with the half of its adjacent cells whose offset is positive"""
+        if self._adjacent is None:
+            offsets = self._offsets()
+            self._adjacent = [(offset, *self._cell_ranges(self.cell_keys + offset)) for offset in offsets[offsets >= 0]]
+        return self._adjacent
+
+    def candidate_pairs(self) -> int:
+        """Returns the number of couples of particles `pairs` computes the distance of, quadratic in the number of
+        particles per cell, so callers can avoid it when the particles are packed into a few cells"""
+        if self.positions is None or len(self.positions) == 0:
+            return 0
+        return int(sum((self.cell_counts * counts).sum() for _, _, counts in self._adjacent_cells()))
+
+    def pairs(self, radius: float, positions=None):
+        """
+        Returns all the pairs of particles closer than the radius
+        :param radius: The radius, at most the cell size
+        :param positions: The positions the distances are measured between, by default the indexed ones. The index can
+        be built on some of their coordinates only (e.g. in many dimensions), the result is exact all the same
+        :return: The arrays (i, j, distance) of the pairs, each pair being listed once (i < j)
+        """
+        if radius > self.cell_size:
+            raise ValueError(f"The radius {radius} is larger than the cell size {self.cell_size}")
+        if self.positions is None or len(self.positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+        # every pair of adjacent cells is visited once
+        first, second = [], []
+        for offset, starts, counts in self._adjacent_cells():
+            slots, other_slots = _expand_cell_pairs(self.cell_starts, self.cell_counts, starts, counts)
+            if offset == 0:
+                keep = slots < other_slots
+                slots, other_slots = slots[keep], other_slots[keep]
+            first.append(self.order[slots])
+            second.append(self.order[other_slots])
+
+        first = np.concatenate(first)
+        second = np.concatenate(second)
+        positions = self.positions if positions is None else np.asarray(positions, dtype=float)
+        distances = np.linalg.norm(positions[first] - positions[second], axis=1)
+        close = distances <= radius
+        first, second = first[close], second[close]
+        swap = first > second
+        first[swap], second[swap] = second[swap], first[swap]
+        return first, second, distances[close]
+
+    def query(self, point, radius: float):
+        """Returns the indices of the particles closer than the radius (at most the cell size) to a point"""
+        if radius > self.cell_size:
+            raise ValueError(f"The radius {radius} is larger than the cell size {self.cell_size}")
+
+        point = np.asarray(point, dtype=float)
+        key = (np.floor(point / self.cell_size).astype(np.int64) - self.origin) @ self.multipliers
+        starts, counts = self._cell_ranges(key + self._offsets())
+        _, slots = _expand_ranges(starts, counts)
+        candidates = self.order[slots]
+        distances = np.linalg.norm(self.positions[candidates] - point, axis=1)
+        return np.sort(candidates[distances <= radius])
+
+    def _cube_ranges(self, particles, ring: int):
+        """Returns the (start, count) ranges of the cells within `ring` cells of the cells of the given particles (along
+        every axis), as arrays of shape (number of cells of a cube, number of particles)"""
+        cells = self.cells[particles]
+        starts, counts = [], []
+        for offset in itertools.product(range(-ring, ring + 1), repeat=len(self.multipliers)):
+            adjacent = cells + offset
+            # the cells past the margin would wrap around to other rows of the numbering
+            inside = ((adjacent >= 0) & (adjacent < self.extents)).all(axis=1)
+            start, count = self._cell_ranges(np.where(inside, adjacent @ self.multipliers, -1))
+            starts.append(start)
+            counts.append(np.where(inside, count, 0))
+        return np.array(starts), np.array(counts)
+
+    def nearest(self, k: int, positions=None, budget: int = 2 ** 22):
+        """
+        Returns the `k` nearest particles of every particle (itself included), by looking at the cells of cubes of
+        doubling sides around it until its k-th nearest candidate is closer than the half side of the cube: a closer
+        particle would have been inside. With about k particles per cell, most particles are done with the
+        3 ** dimensions adjacent cells.
+        :param k: The number of neighbours, at most the number of particles
+        :param positions: The positions the distances are measured between, by default the indexed ones. The index can
+        be built on some of their coordinates only (e.g. in many dimensions), the result is exact all the same
+        :param budget: The largest number of candidate distances computed at once, bounding the memory
+        :return: An integer array of shape (number_of_particles, k), sorted by distance
+        """
+        positions = self.positions if positions is None else np.asarray(positions, dtype=float)
+        number_of_particles = len(positions)
+        neighbours = np.empty((number_of_particles, k), dtype=np.int64)
+        remaining = np.arange(number_of_particles)
+        ring = 1
+        while len(remaining):
+            # once the cube has more cells than there are occupied ones (e.g. for the few particles far from all the
+            # others), the candidates of the remaining particles are all the particles
+            complete = (2 * ring + 1) ** len(self.multipliers) > len(self.cell_keys)
+            if complete:
+                starts = np.zeros((1, len(remaining)), dtype=np.int64)
+                counts = np.full((1, len(remaining)), number_of_particles)
+            else:
+                starts, counts = self._cube_ranges(remaining, ring)
+            totals = counts.sum(axis=0)
+
+            done = np.zeros(len(remaining), dtype=bool)
+            for members in _batches(totals, budget):
+                owners, slots = _expand_ranges(starts[:, members].T.ravel(), counts[:, members].T.ravel())
+                owners //= len(starts)
+                sizes = totals[members]
+                if sizes.max() < k:
+                    continue
+                candidates = self.order[slots]
+                particles = remaining[members[owners]]
+                differences = positions[candidates] - positions[particles]
+
+                # the candidates of every particle are laid out on a row, padded with infinite distances
+                columns = np.arange(len(owners)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+                distances = np.full((len(members), sizes.max()), np.inf)
+                distances[owners, columns] = np.einsum('ij,ij->i', differences, differences)
+                # a particle is always its own nearest neighbour, even among particles at the same position
+                own = candidates == particles
+                distances[owners[own], columns[own]] = -1
+                rows = np.full(distances.shape, -1, dtype=np.int64)
+                rows[owners, columns] = candidates
+
+                kept = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                nearest = np.take_along_axis(distances, kept, axis=1)
+                kept = np.take_along_axis(kept, np.argsort(nearest, axis=1), axis=1)
+                kth = nearest.max(axis=1)
+                resolved = (sizes >= k) & (complete | (kth <= (ring * self.cell_size) ** 2))
+
+                neighbours[remaining[members[resolved]]] = np.take_along_axis(rows, kept, axis=1)[resolved]
+                done[members[resolved]] = True
+            remaining = remaining[~done]
+            ring *= 2
+        return neighbours
+
+    def neighbourhood_sums(self, values):
+        """
+        Sums values over the particles of the adjacent cells of every particle (its own cell included), in time linear
+        in the number of particles whatever their spread
+        :param values: An array of shape (number_of_particles, k), row i belonging to particle i
+        :return: The number of particles and the sum of their values in the neighbourhood of every particle, arrays of
+        shape (number_of_particles,) and (number_of_particles, k)
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(values.shape)
+        cell_sums = np.add.reduceat(values[self.order], self.cell_starts, axis=0)
+
+        counts = np.zeros(len(self.cell_keys), dtype=np.int64)
+        sums = np.zeros(cell_sums.shape)
+        for offset in self._offsets():
+            index, found = self._find_cells(self.cell_keys + offset)
+            counts += np.where(found, self.cell_counts[index], 0)
+            sums += np.where(found[:, None], cell_sums[index], 0)
+
+        cells = np.empty(len(self.order), dtype=np.int64)
+        cells[self.order] = np.repeat(np.arange(len(self.cell_keys)), self.cell_counts)
+        return counts[cells], sums[cells]
+
+
+class Crowding:
+    """
+    Repulsion between the particles closer than a radius, added to their velocities to keep the swarm diverse: each
+    pair pushes its particles apart with a strength decreasing linearly from `weight` (same position) to 0 (at the
+    radius). Particles at the same position are pushed in a random direction. The close pairs are found with a
+    `SpatialHash`, rebuilt every step.
+    Once the swarm has converged into a few cells, the pairs become quadratic in the number of particles: past
+    `max_neighbours` candidate pairs per particle, every particle is instead pushed away from the centroid of the
+    particles of its adjacent cells, as strongly as by all of them (at most `max_neighbours`) standing there.
+    In more than `grid_dimensions` dimensions, the grid is built on the coordinates the particles are the most spread
+    along (the number of adjacent cells growing exponentially with its dimensions), the distances on all of them.
+    """
+    def __init__(self, radius: float, weight: float = 1.0, max_neighbours: int = 64, grid_dimensions: int = 3):
+        """
+        :param radius: The distance under which the particles repel each other
+        :param weight: The strength of the repulsion of two particles at the same position
+        :param max_neighbours: The average number of candidate pairs per particle past which the repulsion is
+        approximated from the cells
+        :param grid_dimensions: The largest number of coordinates the grid is built on
+        """
+        if grid_dimensions < 1:
+            raise ValueError(f"The grid needs at least one dimension, got {grid_dimensions}")
+        self.radius = radius
+        self.weight = weight
+        self.max_neighbours = max_neighbours
+        self.grid_dimensions = grid_dimensions
+        self.index = SpatialHash(radius)
+
+    def velocities(self, swarm):
+        """Returns the crowding term of the velocity of every particle"""
+        positions = swarm.positions
+        if positions.shape[1] > self.grid_dimensions:
+            axes = np.sort(np.argsort(np.ptp(positions, axis=0))[-self.grid_dimensions:])
+            self.index.build(positions[:, axes])
+        else:
+            self.index.build(positions)
+        if self.index.candidate_pairs() > self.max_neighbours * len(positions):
+            return self._approximate_velocities(swarm)
+
+        first, second, distances = self.index.pairs(self.radius, positions)
+        push = self._unit_directions(swarm, positions[first] - positions[second], distances) \
+            * (self.weight * (1 - distances / self.radius))[:, None]
+
+        crowding = np.zeros(positions.shape)
+        for dimension in range(positions.shape[1]):
+            crowding[:, dimension] = (np.bincount(first, push[:, dimension], minlength=len(positions))
+                                      - np.bincount(second, push[:, dimension], minlength=len(positions)))
+        return crowding
+
+    def _approximate_velocities(self, swarm):
+        positions = swarm.positions
+        counts, sums = self.index.neighbourhood_sums(positions)
+        others = counts - 1
+        centroids = (sums - positions) / np.maximum(others, 1)[:, None]
+
+        directions = positions - centroids
+        distances = np.linalg.norm(directions, axis=1)
+        strength = self.weight * np.minimum(others, self.max_neighbours) * np.clip(1 - distances / self.radius, 0, 1)
+        return self._unit_directions(swarm, directions, distances) * strength[:, None]
+
+    @staticmethod
+    def _unit_directions(swarm, directions, distances):
+        """Normalizes the directions (of the given norms), the null ones being replaced by random unit vectors: the
+        distance of particles at the same position stays 0, so they are pushed apart at full strength"""
+        directions = directions.astype(float)
+        overlapping = distances == 0
+        directions[~overlapping] /= distances[~overlapping, None]
+        if overlapping.any():
+            random = swarm.rng.normal(size=(int(overlapping.sum()), directions.shape[1]))
+            directions[overlapping] = random / np.linalg.norm(random, axis=1, keepdims=True)
+        return directions
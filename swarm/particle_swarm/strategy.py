@@ -1,4 +1,51 @@
-from perlin_noise import PerlinNoise
+import random
+
+import numpy as np
+
+from swarm.particle_swarm.terrain_cache import TerrainCache
+
+
+def _fade(t):
+    return 6 * t ** 5 - 15 * t ** 4 + 10 * t ** 3
+
+
+def _gradient(i: int, j: int, seed: int):
+    # same gradients as the `perlin_noise` package: the lattice corner is hashed into the seed of `random`
+    generator = random.Random(seed * max(1, abs(i + 10 * j + 1)))
+    return generator.uniform(-1, 1), generator.uniform(-1, 1)
+
+
+def perlin_field(octaves: int, seed: int, width: int, height: int):
+    """
+    Computes the Perlin noise of every cell of a (width, height) grid at once, cell (x, y) having the value of
+    `PerlinNoise(octaves, seed)([x / width, y / height])` from the `perlin_noise` package.
+    Only the (octaves + 1) ** 2 gradients of the lattice are drawn one by one, the interpolation is done on whole
+    arrays.
+    :param octaves: The number of lattice cells along each axis
+    :param seed: The seed of the gradients (positive)
+    :param width: The number of rows of the grid
+    :param height: The number of columns of the grid
+    :return: A float array of shape (width, height)
+    """
+    x = (np.arange(width) / width) * octaves
+    y = (np.arange(height) / height) * octaves
+    x_cell = np.floor(x).astype(int)
+    y_cell = np.floor(y).astype(int)
+
+    gradients = np.array([[_gradient(i, j, seed) for j in range(int(y_cell.max(initial=0)) + 2)]
+                          for i in range(int(x_cell.max(initial=0)) + 2)])
+
+    field = np.zeros((width, height))
+    for corner_x in (0, 1):
+        dx = (x - (x_cell + corner_x))[:, None]
+        for corner_y in (0, 1):
+            dy = (y - (y_cell + corner_y))[None, :]
+            gradient = gradients[(x_cell + corner_x)[:, None], (y_cell + corner_y)[None, :]]
+            weight = _fade(1 - np.abs(dx)) * _fade(1 - np.abs(dy))
+            field += weight * (gradient[..., 0] * dx + gradient[..., 1] * dy)
+
+    return field
+
 
 class MapStrategy:
     def initialize_map(self, width: int, height:  int):
@@ -7,11 +54,19 @@ class MapStrategy:
 
 class PerlinNoiseMapStrategy(MapStrategy):
 
-    def __init__(self, octaves, seed):
-        self.noise = PerlinNoise(octaves=octaves, seed=seed)
-
+    def __init__(self, octaves, seed, cache_dir: str = None):
+        """
+        :param octaves: The number of noise lattice cells along each side of the map
+        :param seed: The seed of the noise
+        :param cache_dir: If set, the generated maps are saved to (and reused from) this directory
+        """
+        self.octaves = octaves
+        self.seed = seed or random.randint(1, 10 ** 5)
+        self.cache = TerrainCache(cache_dir) if cache_dir is not None else None
 
     def initialize_map(self, width: int, height: int):
-        return [[self.noise([x/width, y/height]) for y in range(width)] for x in range(height)]
-
+        key = ("perlin", self.octaves, self.seed, width, height)
+        if self.cache is None:
+            return perlin_field(self.octaves, self.seed, width, height)
 
+        return self.cache.get_or_create(key, lambda: perlin_field(self.octaves, self.seed, width, height))
@@ -0,0 +1,262 @@
+import argparse
+import copy
+import csv
+import itertools
+import time
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from swarm.particle_swarm.dir_util import make_file_dir_if_not_exist
+from swarm.particle_swarm.objective import GridObjective
+from swarm.particle_swarm.particle_swarm_simulator import ParticleSwarm
+from swarm.particle_swarm.simulation_terminator import IterationTerminator
+from swarm.particle_swarm.strategy import PerlinNoiseMapStrategy
+
+# The `ParticleSwarm` parameters a sweep can vary
+SWEEP_PARAMETERS = ("current_velocity_weight", "best_local_weight", "best_global_weight", "velocity_max_magnitude",
+                    "number_of_particles", "random_local", "random_global")
+
+
+def parameter_grid(**values) -> list[dict]:
+    """Returns every combination of the given parameter values, e.g. `parameter_grid(best_global_weight=[1, 2])`"""
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def random_search(space: dict, samples: int, seed: int = 0) -> list[dict]:
+    """
+    Returns random parameter combinations
+    :param space: For every parameter, either a (low, high) tuple, drawn uniformly (as an integer if both bounds are
+    integers), or a list of values to choose from
+    :param samples: The number of combinations
+    :param seed: The seed of the draws
+    """
+    rng = np.random.default_rng(seed)
+    configurations = []
+    for _ in range(samples):
+        configuration = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    configuration[name] = int(rng.integers(low, high + 1))
+                else:
+                    configuration[name] = float(rng.uniform(low, high))
+            else:
+                configuration[name] = values[rng.integers(len(values))]
+        configurations.append(configuration)
+    return configurations
+
+
+class SharedTerrain:
+    """
+    A map copied once into shared memory, so the workers of a sweep attach to it instead of regenerating or receiving
+    their own copy. Only the (name, shape, dtype) handle is sent to the workers.
+    """
+    def __init__(self, terrain):
+        terrain = np.asarray(terrain, dtype=float)
+        self.memory = SharedMemory(create=True, size=max(terrain.nbytes, 1))
+        self.handle = (self.memory.name, terrain.shape, terrain.dtype.str)
+        self.array = np.ndarray(terrain.shape, dtype=terrain.dtype, buffer=self.memory.buf)
+        self.array[:] = terrain
+
+    @staticmethod
+    def attach(handle):
+        """Returns the shared memory and the array of a terrain shared by another process"""
+        name, shape, dtype = handle
+        memory = SharedMemory(name=name)
+        return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+    def close(self):
+        self.array = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# State of the pool processes, attached to the shared terrain once by `_attach_terrain`
+_worker = {}
+
+
+def _attach_terrain(handle):
+    _worker["memory"], _worker["terrain"] = SharedTerrain.attach(handle)
+
+
+def time_to_threshold(history, threshold, search_minimum: bool) -> int:
+    """Returns the first step at which the best value reached the threshold, or -1 if it never did"""
+    reached = history <= threshold if search_minimum else history >= threshold
+    return int(np.argmax(reached)) if reached.any() else -1
+
+
+def run_configuration(terrain, parameters: dict, seed: int, swarm_options: dict, threshold=None) -> dict:
+    """
+    Runs a swarm on a terrain
+    :param terrain: The map searched by the swarm
+    :param parameters: The `ParticleSwarm` parameters of the run
+    :param seed: The seed of the run
+    :param swarm_options: The other `ParticleSwarm` parameters, shared by all the runs (including the terminator)
+    :param threshold: If set, the time to threshold of the run is measured
+    :return: The best value, the number of steps, the time to threshold, the duration and the history of the run
+    """
+    start = time.perf_counter()
+    # every run gets its own copy of the options, as custom terminators or initializations can keep state
+    swarm_options = copy.deepcopy(swarm_options)
+    swarm = ParticleSwarm(objective=GridObjective(terrain), seed=seed, **swarm_options, **parameters)
+    result = swarm.solve()
+    seconds = time.perf_counter() - start
+
+    return {
+        "best_value": float(result.best_value),
+        "steps": result.steps,
+        "time_to_threshold": -1 if threshold is None else time_to_threshold(result.history, threshold,
+                                                                            swarm.search_minimum),
+        "seconds": seconds,
+        "history": result.history,
+    }
+
+
+def _run_shared(parameters, seed, swarm_options, threshold):
+    return run_configuration(_worker["terrain"], parameters, seed, swarm_options, threshold)
+
+
+def sweep(terrain, configurations: list[dict], seeds=(0,), processes: int = None, threshold=None,
+          **swarm_options) -> dict:
+    """
+    Runs every configuration with every seed on a process pool, the terrain being shared with the workers
+    :param terrain: The map searched by the swarms
+    :param configurations: The parameters of the runs (see `parameter_grid` and `random_search`)
+    :param seeds: The seeds every configuration is run with
+    :param processes: The number of worker processes, by default the number of CPUs
+    :param threshold: If set, the step at which every run reached this value is measured
+    :param swarm_options: The other `ParticleSwarm` parameters, shared by all the runs (e.g. `search_minimum` or
+    `simulation_terminator`, which is copied for every run)
+    :return: A dictionary of columns, one row per run: `configuration` (its index), `seed`, one column per swept
+    parameter (NaN where a configuration does not set it), `best_value`, `steps`, `time_to_threshold` (-1 if never
+    reached), `seconds` and `history`, the best value after every step (runs which stopped earlier are padded with
+    their final value)
+    """
+    swarm_options.setdefault("simulation_terminator", IterationTerminator(100))
+    tasks = [(index, seed) for index in range(len(configurations)) for seed in seeds]
+
+    with SharedTerrain(terrain) as shared:
+        with Pool(processes, initializer=_attach_terrain, initargs=(shared.handle,)) as pool:
+            runs = pool.starmap(_run_shared, [(configurations[index], seed, swarm_options, threshold)
+                                              for index, seed in tasks])
+
+    length = max((len(run["history"]) for run in runs), default=0)
+    history = np.array([np.pad(run["history"], (0, length - len(run["history"])), mode="edge") for run in runs])
+
+    names = [name for name in SWEEP_PARAMETERS if any(name in configuration for configuration in configurations)]
+    names += sorted({name for configuration in configurations for name in configuration} - set(names))
+
+    results = {
+        "configuration": np.array([index for index, _ in tasks], dtype=np.int64),
+        "seed": np.array([seed for _, seed in tasks], dtype=np.int64),
+    }
+    for name in names:
+        results[name] = np.array([np.nan if configurations[index].get(name) is None else configurations[index][name]
+                                  for index, _ in tasks], dtype=float)
+    for column in ("best_value", "steps", "time_to_threshold", "seconds"):
+        results[column] = np.array([run[column] for run in runs])
+    results["history"] = history.reshape(len(runs), length)
+    return results
+
+
+def summarize(results: dict) -> list[dict]:
+    """Aggregates the runs of every configuration over the seeds: the mean and standard deviation of the best value,
+    the rate of runs reaching the threshold, the mean time to threshold of those, and the mean best value after every
+    step (`history`)"""
+    parameters = [name for name in results if name not in ("configuration", "seed", "best_value", "steps",
+                                                          "time_to_threshold", "seconds", "history")]
+    rows = []
+    for configuration in np.unique(results["configuration"]):
+        runs = results["configuration"] == configuration
+        reached = results["time_to_threshold"][runs]
+        reached = reached[reached >= 0]
+
+        row = {"configuration": int(configuration)}
+        row.update({name: float(results[name][runs][0]) for name in parameters})
+        row.update({
+            "runs": int(runs.sum()),
+            "mean_best_value": float(results["best_value"][runs].mean()),
+            "std_best_value": float(results["best_value"][runs].std()),
+            "threshold_rate": len(reached) / runs.sum(),
+            "mean_time_to_threshold": float(reached.mean()) if len(reached) else -1.0,
+            "mean_seconds": float(results["seconds"][runs].mean()),
+            "history": results["history"][runs].mean(axis=0),
+        })
+        rows.append(row)
+    return rows
+
+
+def save_results(filename: str, results: dict):
+    """Saves the columns of a sweep: all of them into a compressed `.npz` file, or the scalar ones (without the
+    histories) into a `.csv` file"""
+    make_file_dir_if_not_exist(filename)
+    if filename.endswith(".csv"):
+        columns = [name for name, column in results.items() if np.ndim(column) == 1]
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(zip(*(results[name].tolist() for name in columns)))
+    else:
+        np.savez_compressed(filename, **results)
+
+
+def _parse_values(text: str):
+    name, values = text.split("=", 1)
+    if ":" in values:
+        low, high = values.split(":")
+        return name, (int(low), int(high)) if name == "number_of_particles" else (float(low), float(high))
+    return name, [int(value) if name == "number_of_particles" else float(value) for value in values.split(",")]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Runs particle swarms over a grid or random search of parameters")
+    parser.add_argument("parameters", nargs="+",
+                        help="The swept parameters, as name=v1,v2,... (grid) or name=low:high (random search), e.g. "
+                             "best_global_weight=1,1.5,2")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Draw this many random combinations instead of the whole grid")
+    parser.add_argument("--seeds", type=int, default=5, help="The number of seeds every combination is run with")
+    parser.add_argument("--width", type=int, default=200, help="The width of the terrain")
+    parser.add_argument("--height", type=int, default=200, help="The height of the terrain")
+    parser.add_argument("--octaves", type=int, default=14, help="The octaves of the Perlin noise terrain")
+    parser.add_argument("--terrain-seed", type=int, default=5, help="The seed of the Perlin noise terrain")
+    parser.add_argument("--iterations", type=int, default=200, help="The number of iterations of every run")
+    parser.add_argument("--minimum", action="store_true", help="Search the minimum instead of the maximum")
+    parser.add_argument("--threshold", type=float, default=None, help="Measure when the runs reach this value")
+    parser.add_argument("--processes", type=int, default=None, help="The number of worker processes")
+    parser.add_argument("--output", default="out/sweep.npz", help="The file where the results are saved")
+    args = parser.parse_args(arguments)
+
+    space = dict(_parse_values(text) for text in args.parameters)
+    if args.samples is not None:
+        configurations = random_search({name: values if isinstance(values, tuple) else list(values)
+                                        for name, values in space.items()}, args.samples)
+    else:
+        if any(isinstance(values, tuple) for values in space.values()):
+            parser.error("low:high ranges need --samples")
+        configurations = parameter_grid(**space)
+
+    terrain = PerlinNoiseMapStrategy(args.octaves, args.terrain_seed).initialize_map(args.width, args.height)
+    results = sweep(terrain, configurations, range(args.seeds), args.processes, args.threshold,
+                    search_minimum=args.minimum, simulation_terminator=IterationTerminator(args.iterations))
+    save_results(args.output, results)
+
+    for row in sorted(summarize(results), key=lambda row: row["mean_best_value"], reverse=not args.minimum):
+        parameters = ", ".join(f"{name}={row[name]:g}" for name in space)
+        print(f"{parameters}: best {row['mean_best_value']:.4f} +- {row['std_best_value']:.4f}, "
+              f"threshold rate {row['threshold_rate']:.0%}, {row['mean_seconds']:.2f} s")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class TerrainCache:
+    """
+    Content-addressed cache of generated maps: every map is saved as a `.npy` file named after the hash of the
+    parameters it was generated from, and memory-mapped (read-only) when requested again, so repeated experiments on
+    the same terrain neither regenerate nor copy it.
+    """
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def path(self, key: tuple) -> Path:
+        """Returns the file of the map generated from the given parameters"""
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return self.directory / f"{digest}.npy"
+
+    def get(self, key: tuple):
+        """Returns the cached map as a read-only memory map, or `None` if it was never generated"""
+        path = self.path(key)
+        if not path.exists():
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def put(self, key: tuple, terrain):
+        """Saves a map (written to a temporary file first, so concurrent readers never see a partial file)"""
+        path = self.path(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary, "wb") as file:
+            np.save(file, np.asarray(terrain))
+        os.replace(temporary, path)
+
+    def get_or_create(self, key: tuple, create):
+        """Returns the cached map, generating it with `create()` and caching it if needed"""
+        terrain = self.get(key)
+        if terrain is None:
+            self.put(key, create())
+            terrain = self.get(key)
+        return terrain
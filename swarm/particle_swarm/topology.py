@@ -0,0 +1,132 @@
+import numpy as np
+
+from swarm.particle_swarm.spatial_hash import SpatialHash
+
+
+class Topology:
+    """
+    Decides which particles inform each other: every particle is attracted by the best personal best of its
+    neighbourhood (instead of the global best), which slows the spread of information and helps on multimodal maps.
+    `neighbourhood_bests` returns these positions for all the particles at once.
+    """
+    def neighbourhood_bests(self, swarm):
+        raise NotImplementedError
+
+
+class GlobalTopology(Topology):
+    """Every particle is informed by the whole swarm, i.e. attracted by the global best"""
+
+    def neighbourhood_bests(self, swarm):
+        return swarm.best
+
+
+def best_of_neighbourhoods(swarm, neighbours):
+    """
+    Returns, for every particle, the best personal best among its neighbours
+    :param swarm: The swarm (with `locals` and `local_values`)
+    :param neighbours: An integer array of shape (number_of_particles, k), row i holding the indices of the neighbours
+    of particle i (including itself)
+    """
+    values = swarm.local_values[neighbours]
+    best = np.argmin(values, axis=1) if swarm.search_minimum else np.argmax(values, axis=1)
+    return swarm.locals[neighbours[np.arange(len(neighbours)), best]]
+
+
+class StaticTopology(Topology):
+    """A topology whose neighbourhoods only depend on the indices of the particles, computed once per swarm size"""
+
+    def __init__(self):
+        self._neighbours = None
+
+    def neighbours(self, number_of_particles: int):
+        raise NotImplementedError
+
+    def neighbourhood_bests(self, swarm):
+        number_of_particles = len(swarm.positions)
+        if self._neighbours is None or len(self._neighbours) != number_of_particles:
+            self._neighbours = self.neighbours(number_of_particles)
+        return best_of_neighbourhoods(swarm, self._neighbours)
+
+
+class RingTopology(StaticTopology):
+    """The particles are placed on a ring, each being informed by the `k` particles on both of its sides"""
+
+    def __init__(self, k: int = 1):
+        super().__init__()
+        self.k = k
+
+    def neighbours(self, number_of_particles: int):
+        offsets = np.arange(-self.k, self.k + 1)
+        return (np.arange(number_of_particles)[:, None] + offsets) % number_of_particles
+
+
+class VonNeumannTopology(StaticTopology):
+    """The particles are placed on a toroidal grid (filled row by row), each being informed by the particles above,
+    below, on the left and on the right of it"""
+
+    def __init__(self, columns: int = None):
+        """
+        :param columns: The number of columns of the grid, by default the one making it as square as possible
+        """
+        super().__init__()
+        self.columns = columns
+
+    def neighbours(self, number_of_particles: int):
+        columns = self.columns or int(np.ceil(np.sqrt(number_of_particles)))
+        index = np.arange(number_of_particles)
+        row, column = np.divmod(index, columns)
+        left = row * columns + (column - 1) % columns
+        right = row * columns + (column + 1) % columns
+        # the last row can be incomplete, so the indices past the last particle wrap around
+        return np.stack([index, left % number_of_particles, right % number_of_particles,
+                         (index - columns) % number_of_particles, (index + columns) % number_of_particles], axis=1)
+
+
+class RandomTopology(Topology):
+    """Every step, each particle is informed by `k` particles drawn at random (and by itself)"""
+
+    def __init__(self, k: int = 3):
+        self.k = k
+
+    def neighbourhood_bests(self, swarm):
+        number_of_particles = len(swarm.positions)
+        informants = swarm.rng.integers(0, number_of_particles, size=(number_of_particles, self.k))
+        neighbours = np.concatenate([np.arange(number_of_particles)[:, None], informants], axis=1)
+        return best_of_neighbourhoods(swarm, neighbours)
+
+
+def nearest_neighbours(positions, k: int, grid_dimensions: int = 3):
+    """
+    Returns the indices of the `k` nearest particles of every particle (itself included), as an array of shape
+    (number_of_particles, k). Uses scipy's KD-tree if it is installed, otherwise a `SpatialHash` sized for about k / 2
+    particles per cell. The grid is built on the `grid_dimensions` coordinates the particles are the most spread along
+    (the number of adjacent cells growing exponentially with its dimensions), the distances on all of them.
+    """
+    positions = np.asarray(positions, dtype=float)
+    k = min(k, len(positions))
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        cKDTree = None
+
+    if cKDTree is not None:
+        _, neighbours = cKDTree(positions).query(positions, k=k)
+        return np.asarray(neighbours).reshape(len(positions), k)
+    if k == 0:
+        return np.empty((len(positions), 0), dtype=np.int64)
+
+    spreads = np.ptp(positions, axis=0)
+    axes = np.sort(np.argsort(spreads)[-grid_dimensions:])
+    spreads = spreads[axes][spreads[axes] > 0]
+    cell_size = float(np.prod(spreads) * k / 2 / len(positions)) ** (1 / len(spreads)) if len(spreads) else 1.0
+    return SpatialHash(cell_size).build(positions[:, axes]).nearest(k, positions)
+
+
+class NearestNeighbourTopology(Topology):
+    """Every step, each particle is informed by the `k` particles closest to it in the search space"""
+
+    def __init__(self, k: int = 5):
+        self.k = k
+
+    def neighbourhood_bests(self, swarm):
+        return best_of_neighbourhoods(swarm, nearest_neighbours(swarm.positions, self.k))
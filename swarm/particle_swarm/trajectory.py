@@ -0,0 +1,225 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+class TrajectorySink:
+    """
+    Receives the positions of the swarm after every step (see `ParticleSwarm.record`) and keeps a decimated part of
+    them: every `every`-th step and every `particle_stride`-th particle. The kept frames are read back by index,
+    `sink[i]` being an array of shape (particles, dimensions) recorded at step `sink.steps[i]`.
+    """
+    def __init__(self, every: int = 1, particle_stride: int = 1):
+        """
+        :param every: Only keep every n-th step
+        :param particle_stride: Only keep every n-th particle
+        """
+        if every < 1 or particle_stride < 1:
+            raise ValueError("The decimation factors must be at least 1")
+        self.every = every
+        self.particle_stride = particle_stride
+
+    def observe(self, step: int, positions):
+        """Records the positions of the particles at the given step, if it is not decimated"""
+        if step % self.every == 0:
+            self.write(step, positions[::self.particle_stride])
+
+    def write(self, step: int, positions):
+        raise NotImplementedError
+
+    @property
+    def steps(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, index: int):
+        raise NotImplementedError
+
+    def frames(self):
+        """Iterates over the kept frames, loading them one at a time"""
+        for index in range(len(self)):
+            yield self[index]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MemorySink(TrajectorySink):
+    """Keeps every frame in memory, so its size grows with the number of recorded steps"""
+
+    def __init__(self, every: int = 1, particle_stride: int = 1):
+        super().__init__(every, particle_stride)
+        self.buffer = []
+        self.buffer_steps = []
+
+    def write(self, step: int, positions):
+        self.buffer.append(np.array(positions))
+        self.buffer_steps.append(step)
+
+    @property
+    def steps(self):
+        return np.array(self.buffer_steps, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, index: int):
+        return self.buffer[index]
+
+
+class RingBufferSink(TrajectorySink):
+    """Keeps the last `capacity` frames in an array allocated once (at the first frame, when its shape is known)"""
+
+    def __init__(self, capacity: int, every: int = 1, particle_stride: int = 1):
+        super().__init__(every, particle_stride)
+        self.capacity = capacity
+        self.buffer = None
+        self.buffer_steps = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def write(self, step: int, positions):
+        if self.buffer is None:
+            self.buffer = np.empty((self.capacity,) + positions.shape, dtype=positions.dtype)
+
+        slot = self.count % self.capacity
+        self.buffer[slot] = positions
+        self.buffer_steps[slot] = step
+        self.count += 1
+
+    def _slot(self, index: int) -> int:
+        size = len(self)
+        if not -size <= index < size:
+            raise IndexError(f"Frame {index} out of range for {size} frames")
+        oldest = max(self.count - self.capacity, 0)
+        return (oldest + index % size) % self.capacity
+
+    @property
+    def steps(self):
+        oldest = max(self.count - self.capacity, 0)
+        return self.buffer_steps[(oldest + np.arange(len(self))) % self.capacity]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def __getitem__(self, index: int):
+        return self.buffer[self._slot(index)]
+
+
+class ChunkedSink(TrajectorySink):
+    """
+    Writes the frames to a directory in chunks of `chunk_size` frames, so only the current chunk is kept in memory.
+    Chunks are `.npy` files, memory-mapped when read back, or compressed `.npz` files (smaller, but a chunk is
+    decompressed as a whole when one of its frames is read).
+    A closed (or flushed) directory can be reopened with `load`.
+    """
+    def __init__(self, directory: str, chunk_size: int = 256, compressed: bool = False, every: int = 1,
+                 particle_stride: int = 1):
+        super().__init__(every, particle_stride)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.compressed = compressed
+
+        self.chunk_count = 0
+        self.pending = []
+        self.all_steps = []
+        self.closed = False
+        self._chunk_cache = (None, None)
+
+    @classmethod
+    def load(cls, directory: str) -> "ChunkedSink":
+        """Reopens the frames written to a directory (the sink must have been flushed or closed)"""
+        directory = Path(directory)
+        with open(directory / "trajectory.json") as file:
+            metadata = json.load(file)
+
+        sink = cls.__new__(cls)
+        TrajectorySink.__init__(sink, metadata["every"], metadata["particle_stride"])
+        sink.directory = directory
+        sink.chunk_size = metadata["chunk_size"]
+        sink.compressed = metadata["compressed"]
+        sink.chunk_count = metadata["chunk_count"]
+        sink.pending = []
+        sink.closed = True
+        sink.all_steps = np.load(directory / "steps.npy").tolist()
+        sink._chunk_cache = (None, None)
+        return sink
+
+    def _chunk_path(self, chunk: int) -> Path:
+        return self.directory / f"chunk_{chunk:06d}.{'npz' if self.compressed else 'npy'}"
+
+    def write(self, step: int, positions):
+        if self.closed:
+            raise ValueError("Cannot write frames to a closed sink")
+        self.pending.append(np.array(positions))
+        self.all_steps.append(step)
+        if len(self.pending) == self.chunk_size:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        frames = np.stack(self.pending)
+        if self.compressed:
+            np.savez_compressed(self._chunk_path(self.chunk_count), positions=frames)
+        else:
+            np.save(self._chunk_path(self.chunk_count), frames)
+        self.chunk_count += 1
+        self.pending = []
+
+    def _load_chunk(self, chunk: int):
+        cached_chunk, frames = self._chunk_cache
+        if cached_chunk != chunk:
+            if self.compressed:
+                with np.load(self._chunk_path(chunk)) as data:
+                    frames = data["positions"]
+            else:
+                frames = np.load(self._chunk_path(chunk), mmap_mode='r')
+            self._chunk_cache = (chunk, frames)
+        return frames
+
+    @property
+    def steps(self):
+        return np.array(self.all_steps, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.all_steps)
+
+    def __getitem__(self, index: int):
+        size = len(self)
+        if not -size <= index < size:
+            raise IndexError(f"Frame {index} out of range for {size} frames")
+        index %= size
+
+        chunk, offset = divmod(index, self.chunk_size)
+        if chunk == self.chunk_count:
+            return self.pending[offset]
+        return self._load_chunk(chunk)[offset]
+
+    def flush(self):
+        """Writes the index of the directory, so the complete chunks can be reopened with `load`. The frames of the
+        current chunk stay in memory (but can be read) until the chunk is full or the sink is closed."""
+        self._write_index(self.chunk_count * self.chunk_size)
+
+    def close(self):
+        """Writes the pending frames as a last, possibly shorter, chunk. No frames can be written afterwards."""
+        if self.pending:
+            self._write_chunk()
+        self.closed = True
+        self._write_index(len(self.all_steps))
+
+    def _write_index(self, frames: int):
+        np.save(self.directory / "steps.npy", self.steps[:frames])
+        with open(self.directory / "trajectory.json", "w") as file:
+            json.dump({"chunk_size": self.chunk_size, "compressed": self.compressed, "chunk_count": self.chunk_count,
+                       "every": self.every, "particle_stride": self.particle_stride}, file)